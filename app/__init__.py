@@ -4,15 +4,22 @@ from litestar import Litestar, get
 from litestar.openapi import OpenAPIConfig
 from litestar.openapi.plugins import ScalarRenderPlugin
 
+from app.cli import LibraryCLIPlugin
 from app.config import settings
 from app.controllers.auth import AuthController
 from app.controllers.book import BookController
 from app.controllers.loan import LoanController
+from app.controllers.metrics import MetricsController
 from app.controllers.user import UserController
 from app.controllers.category import CategoryController
 from app.controllers.review import ReviewController 
-from app.db import sqlalchemy_plugin
-from app.security import oauth2_auth
+from app.db import begin_unit_of_work, close_pool, open_pool, sqlalchemy_plugin
+from app.metrics import MetricsMiddleware
+from app.negotiation import NegotiatedRequest, NegotiatedResponse
+from app.passwords import password_pool
+from app.replica import ReadReplicaMiddleware, replica_monitor
+from app.response_cache import catalog_cache
+from app.security import oauth2_auth, principal_cache
 
 # Endpoint de raíz para solucionar error de raíz vacía
 @get("/", tags=["root"])
@@ -40,9 +47,16 @@ app = Litestar(
         AuthController,
         CategoryController,
         ReviewController,
+        MetricsController,
     ],
+    middleware=[MetricsMiddleware, ReadReplicaMiddleware],
     openapi_config=openapi_config,
+    request_class=NegotiatedRequest,
+    response_class=NegotiatedResponse,
     debug=settings.debug,
-    plugins=[sqlalchemy_plugin],
+    plugins=[sqlalchemy_plugin, LibraryCLIPlugin()],
+    before_request=begin_unit_of_work,
+    on_startup=[open_pool, replica_monitor.start],
+    on_shutdown=[password_pool.shutdown, replica_monitor.stop, close_pool, catalog_cache.close, principal_cache.close],
     #on_app_init=[oauth2_auth.on_app_init],
 )
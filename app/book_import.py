@@ -0,0 +1,349 @@
+"""Bulk book import from CSV or NDJSON through a COPY staging table."""
+
+import csv
+import json
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, AsyncIterator, Literal
+
+from sqlalchemy import ARRAY, Column, Integer, MetaData, String, Table, any_, delete, exists, func, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Book, Category, book_categories
+
+IMPORT_BATCH_SIZE = 5000
+
+BOOK_COLUMNS = (
+    "title",
+    "author",
+    "isbn",
+    "pages",
+    "published_year",
+    "stock",
+    "description",
+    "language",
+    "publisher",
+)
+REQUIRED_COLUMNS = ("title", "author", "isbn", "pages", "published_year", "language")
+INT_COLUMNS = ("pages", "published_year", "stock")
+# stock de un libro nuevo cuando el archivo no lo trae; a un libro existente no se le toca
+DEFAULT_STOCK = 1
+
+ImportFormat = Literal["csv", "ndjson"]
+
+# tabla temporal donde se cargan los lotes con COPY; se vacía después de cada lote y se borra al hacer commit
+_staging = Table(
+    "book_import_staging",
+    MetaData(),
+    Column("line", Integer),
+    Column("title", String),
+    Column("author", String),
+    Column("isbn", String),
+    Column("pages", Integer),
+    Column("published_year", Integer),
+    Column("stock", Integer),
+    Column("description", String),
+    Column("language", String),
+    Column("publisher", String),
+    Column("categories", ARRAY(String)),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DROP",
+)
+_STAGING_TYPES = ["int4", "text", "text", "text", "int4", "int4", "int4", "text", "text", "text", "text[]"]
+
+
+@dataclass
+class BookImportError:
+    """A row that was not imported."""
+
+    line: int
+    isbn: str | None
+    error: str
+
+
+@dataclass
+class BookImportReport:
+    """Result of a bulk import."""
+
+    total_rows: int = 0
+    inserted: int = 0
+    updated: int = 0
+    errors: list[BookImportError] = field(default_factory=list)
+
+
+def validate_new_book(payload: dict[str, Any]) -> str | None:
+    """Return the first validation error of a new book, or None.
+
+    Mismas reglas que POST /books.
+    """
+    current_year = datetime.now().year
+    published_year = payload.get("published_year")
+    if published_year is None or not (1000 <= published_year <= current_year):
+        return f"El año de publicación debe estar entre 1000 y {current_year}"
+
+    stock = payload.get("stock", 1)
+    if stock is None or stock <= 0:
+        return "El stock debe ser mayor que 0"
+
+    language = payload.get("language")
+    if not isinstance(language, str) or len(language) != 2:
+        return "El idioma debe ser un código de 2 letras (por ejemplo: 'es', 'en', 'fr')."
+
+    return None
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a byte stream into decoded lines."""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8").rstrip("\r")
+    if buffer:
+        yield buffer.decode("utf-8").rstrip("\r")
+
+
+class _LineFeed:
+    """Iterator over the lines pushed so far; the single ``csv.reader`` of an import reads from it."""
+
+    def __init__(self) -> None:
+        self.lines: deque[str] = deque()
+
+    def __iter__(self) -> "_LineFeed":
+        return self
+
+    def __next__(self) -> str:
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+
+async def _iter_ndjson(lines: AsyncIterator[str]) -> AsyncIterator[tuple[int, dict[str, Any] | None, str | None]]:
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield line_number, None, f"JSON inválido: {exc.msg}"
+            continue
+        if not isinstance(record, dict):
+            yield line_number, None, "Cada línea debe ser un objeto JSON"
+            continue
+        yield line_number, record, None
+
+
+async def _iter_csv(lines: AsyncIterator[str]) -> AsyncIterator[tuple[int, dict[str, Any] | None, str | None]]:
+    # un solo csv.reader para todo el archivo: un campo entre comillas puede tener saltos
+    # de línea. Se le pasa un registro cuando está completo, o sea, cuando las comillas
+    # acumuladas son pares (las comillas escapadas van dobles y no cambian la paridad).
+    feed = _LineFeed()
+    reader = csv.reader(feed)
+    header: list[str] | None = None
+    quotes = 0
+    async for line in lines:
+        feed.lines.append(line + "\n")
+        quotes += line.count('"')
+        if quotes % 2:
+            continue
+        quotes = 0
+
+        values = next(reader)
+        if not any(value.strip() for value in values):
+            continue
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield reader.line_num, None, f"Se esperaban {len(header)} columnas y vinieron {len(values)}"
+            continue
+        record = {name: value if value != "" else None for name, value in zip(header, values)}
+        if record.get("categories") is not None:
+            record["categories"] = [name.strip() for name in record["categories"].split("|") if name.strip()]
+        yield reader.line_num, record, None
+
+    if feed.lines:
+        yield reader.line_num + 1, None, "Hay comillas sin cerrar hasta el final del archivo"
+
+
+def iter_records(
+    lines: AsyncIterator[str],
+    fmt: ImportFormat,
+) -> AsyncIterator[tuple[int, dict[str, Any] | None, str | None]]:
+    """Yield ``(line, record, parse_error)`` for every non-empty record.
+
+    En CSV la primera fila es el encabezado, un campo entre comillas puede ocupar
+    varias líneas (``line`` es la última) y las categorías van separadas por ``|``.
+    """
+    return _iter_ndjson(lines) if fmt == "ndjson" else _iter_csv(lines)
+
+
+def _coerce(record: dict[str, Any]) -> tuple[dict[str, Any], list[str]]:
+    """Normalize a raw record; raises ValueError with a readable message."""
+    missing = [name for name in REQUIRED_COLUMNS if record.get(name) in (None, "")]
+    if missing:
+        raise ValueError(f"Faltan campos obligatorios: {', '.join(missing)}")
+
+    book: dict[str, Any] = {}
+    for name in BOOK_COLUMNS:
+        value = record.get(name)
+        if value == "":
+            # una celda vacía es un dato que no vino, no un texto vacío
+            value = None
+        if name in INT_COLUMNS and value is not None:
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"'{name}' debe ser un número entero") from None
+        elif value is not None:
+            value = str(value)
+        book[name] = value
+
+    categories = record.get("categories") or []
+    if not isinstance(categories, list):
+        raise ValueError("'categories' debe ser una lista de nombres")
+    return book, [str(name) for name in categories]
+
+
+class BookImporter:
+    """Loads validated rows in batches: COPY to staging, upsert on isbn, attach categories.
+
+    No hace commit: todos los lotes van en la transacción de la sesión, que es
+    del que llama (la unidad de trabajo del request o la CLI). Si algo falla a
+    mitad del archivo no queda ningún lote a medias.
+    """
+
+    def __init__(self, session: AsyncSession, batch_size: int = IMPORT_BATCH_SIZE) -> None:
+        self.session = session
+        self.batch_size = batch_size
+        self.report = BookImportReport()
+        self._seen_isbns: set[str] = set()
+        self._seen_titles: set[str] = set()
+        self._category_names: set[str] | None = None
+        self._staging_created = False
+
+    async def run(self, records: AsyncIterator[tuple[int, dict[str, Any] | None, str | None]]) -> BookImportReport:
+        """Import every record and return the per-row report."""
+        self._category_names = set(await self.session.scalars(select(Category.name)))
+
+        batch: list[tuple[Any, ...]] = []
+        async for line, record, parse_error in records:
+            self.report.total_rows += 1
+            row = self._validate(line, record, parse_error)
+            if row is None:
+                continue
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                await self._load(batch)
+                batch = []
+
+        if batch:
+            await self._load(batch)
+        return self.report
+
+    def _reject(self, line: int, isbn: str | None, error: str) -> None:
+        self.report.errors.append(BookImportError(line=line, isbn=isbn, error=error))
+
+    def _validate(self, line: int, record: dict[str, Any] | None, parse_error: str | None) -> tuple[Any, ...] | None:
+        if record is None:
+            self._reject(line, None, parse_error or "Registro inválido")
+            return None
+
+        isbn = str(record["isbn"]) if record.get("isbn") is not None else None
+        try:
+            book, categories = _coerce(record)
+        except ValueError as exc:
+            self._reject(line, isbn, str(exc))
+            return None
+
+        # un stock vacío no se valida: en un libro nuevo es DEFAULT_STOCK y en uno existente no cambia
+        error = validate_new_book({**book, "stock": DEFAULT_STOCK if book["stock"] is None else book["stock"]})
+        if error is None and book["isbn"] in self._seen_isbns:
+            error = "ISBN duplicado en el archivo"
+        if error is None and book["title"] in self._seen_titles:
+            error = "Título duplicado en el archivo"
+        if error is None:
+            unknown = [name for name in categories if name not in self._category_names]
+            if unknown:
+                error = f"Categorías inexistentes: {', '.join(unknown)}"
+        if error is not None:
+            self._reject(line, book["isbn"], error)
+            return None
+
+        self._seen_isbns.add(book["isbn"])
+        self._seen_titles.add(book["title"])
+        return (line, *(book[name] for name in BOOK_COLUMNS), categories)
+
+    async def _load(self, batch: list[tuple[Any, ...]]) -> None:
+        connection = await self.session.connection()
+        if not self._staging_created:
+            await connection.run_sync(_staging.create)
+            self._staging_created = True
+
+        raw_connection = await connection.get_raw_connection()
+        async with raw_connection.driver_connection.cursor() as cursor:
+            columns = ", ".join(column.name for column in _staging.columns)
+            async with cursor.copy(f"COPY {_staging.name} ({columns}) FROM STDIN") as copy:
+                copy.set_types(_STAGING_TYPES)
+                for row in batch:
+                    await copy.write_row(row)
+
+        # el título también es único: no se puede pisar el de otro libro
+        books = Book.__table__
+        conflicts = (
+            await self.session.execute(
+                select(_staging.c.line, _staging.c.isbn)
+                .join(books, books.c.title == _staging.c.title)
+                .where(books.c.isbn != _staging.c.isbn)
+            )
+        ).all()
+        if conflicts:
+            for line, isbn in conflicts:
+                self._reject(line, isbn, "Ya existe otro libro con ese título")
+            await self.session.execute(delete(_staging).where(_staging.c.line.in_([line for line, _ in conflicts])))
+
+        # libros existentes: solo se pisan las columnas que el archivo trae (una celda vacía
+        # no borra la descripción ni la editorial, y sin stock se conserva el actual)
+        updated = await self.session.scalars(
+            update(books)
+            .where(books.c.isbn == _staging.c.isbn)
+            .values(
+                {
+                    **{name: func.coalesce(_staging.c[name], books.c[name]) for name in BOOK_COLUMNS if name != "isbn"},
+                    "updated_at": func.now(),
+                }
+            )
+            .returning(books.c.id)
+        )
+        self.report.updated += len(updated.all())
+
+        # libros nuevos; si otra importación inserta el mismo isbn a la vez, el índice único
+        # lo rechaza (IntegrityError, 409) y se deshace todo el archivo
+        new_books = select(
+            *(func.coalesce(_staging.c.stock, DEFAULT_STOCK) if name == "stock" else _staging.c[name] for name in BOOK_COLUMNS),
+            func.now(),
+            func.now(),
+        ).where(~exists().where(books.c.isbn == _staging.c.isbn))
+        inserted = await self.session.scalars(
+            insert(books).from_select([*BOOK_COLUMNS, "created_at", "updated_at"], new_books).returning(books.c.id)
+        )
+        self.report.inserted += len(inserted.all())
+
+        await self.session.execute(
+            pg_insert(book_categories)
+            .from_select(
+                ["book_id", "category_id"],
+                select(books.c.id, Category.__table__.c.id)
+                .select_from(_staging)
+                .join(books, books.c.isbn == _staging.c.isbn)
+                .join(Category.__table__, Category.__table__.c.name == any_(_staging.c.categories)),
+            )
+            .on_conflict_do_nothing()
+        )
+
+        await self.session.execute(delete(_staging))
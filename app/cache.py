@@ -0,0 +1,108 @@
+"""In-process caches and the shared store used to keep workers consistent."""
+
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, TypeVar
+
+from litestar.stores.base import Store
+
+K = TypeVar("K")
+T = TypeVar("T")
+
+
+def build_redis_store(redis_url: str, namespace: str) -> Store:
+    """Build a store shared by every worker and the CLI on a Redis (or compatible) server."""
+    # dependencia opcional (extra "redis"): solo se importa si se configuró Redis
+    from litestar.stores.redis import RedisStore
+
+    return RedisStore.with_client(url=redis_url, namespace=namespace)
+
+
+class SnapshotCache(Generic[T]):
+    """Single-value cache with a TTL and explicit invalidation.
+
+    A ttl of 0 disables the cache. Writers call ``invalidate``; a value computed
+    while an invalidation happened is discarded instead of cached.
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self._value: T | None = None
+        self._expires_at = 0.0
+        self._generation = 0
+
+    @property
+    def generation(self) -> int:
+        """Counter bumped on every invalidation."""
+        return self._generation
+
+    def get(self) -> T | None:
+        """Return the cached value, or None if missing or expired."""
+        if self.ttl <= 0 or time.monotonic() >= self._expires_at:
+            return None
+        return self._value
+
+    def set(self, value: T, generation: int) -> None:
+        """Cache a value computed when ``generation`` was current."""
+        if self.ttl <= 0 or generation != self._generation:
+            return
+        self._value = value
+        self._expires_at = time.monotonic() + self.ttl
+
+    def invalidate(self) -> None:
+        """Drop the cached value."""
+        self._generation += 1
+        self._value = None
+        self._expires_at = 0.0
+
+
+class TTLCache(Generic[K, T]):
+    """Bounded LRU cache whose entries expire after ``ttl`` seconds.
+
+    A ttl of 0 disables the cache. ``hits`` and ``misses`` count lookups.
+    """
+
+    def __init__(self, ttl: float, maxsize: int) -> None:
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[K, tuple[float, T]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K) -> T | None:
+        """Return the cached value for ``key``, or None if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() >= entry[0]:
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: K, value: T) -> None:
+        """Cache ``value`` under ``key``, evicting the least recently used entry if full."""
+        if self.ttl <= 0 or self.maxsize <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def discard(self, key: K) -> None:
+        """Remove ``key`` if present."""
+        self._entries.pop(key, None)
+
+    def discard_where(self, predicate: Callable[[T], bool]) -> None:
+        """Remove every entry whose value matches ``predicate``."""
+        for key in [key for key, (_, value) in self._entries.items() if predicate(value)]:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        self._entries.clear()
@@ -0,0 +1,143 @@
+"""Custom Litestar CLI commands (``litestar library ...``)."""
+
+import asyncio
+import json
+from dataclasses import asdict
+from pathlib import Path
+
+import click
+from click import Group
+from litestar.plugins import CLIPluginProtocol
+
+
+@click.group(name="library")
+def library_group() -> None:
+    """Library maintenance commands."""
+
+
+@library_group.command(name="sweep-overdue")
+def sweep_overdue() -> None:
+    """Mark ACTIVE loans past their due date as OVERDUE (safe to run from cron)."""
+    from app.db import close_pool, sqlalchemy_config
+    from app.repositories.loan import LoanRepository
+
+    async def _sweep() -> list[int]:
+        try:
+            async with sqlalchemy_config.get_session() as session:
+                loan_ids = await LoanRepository(session=session).mark_overdue_loans()
+                await session.commit()
+                return loan_ids
+        finally:
+            await sqlalchemy_config.get_engine().dispose()
+            await close_pool()
+
+    loan_ids = asyncio.run(_sweep())
+    click.echo(f"{len(loan_ids)} préstamos marcados como OVERDUE")
+
+
+@library_group.command(name="import-books")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.option("--format", "fmt", type=click.Choice(["csv", "ndjson"]), default=None, help="Por defecto se deduce de la extensión.")
+@click.option("--errors", "errors_path", type=click.Path(dir_okay=False, path_type=Path), default=None, help="Archivo JSON para el detalle de filas rechazadas.")
+def import_books(path: Path, fmt: str | None, errors_path: Path | None) -> None:
+    """Bulk import books from a CSV or NDJSON file (upsert on isbn)."""
+    from app.book_import import BookImporter, iter_records
+    from app.db import close_pool, sqlalchemy_config
+    from app.response_cache import catalog_cache
+
+    fmt = fmt or ("ndjson" if path.suffix in {".ndjson", ".jsonl"} else "csv")
+
+    async def _lines():
+        with path.open(encoding="utf-8", newline="") as file:
+            for line in file:
+                yield line.rstrip("\r\n")
+
+    async def _import():
+        try:
+            async with sqlalchemy_config.get_session() as session:
+                report = await BookImporter(session).run(iter_records(_lines(), fmt))
+                await session.commit()
+            await catalog_cache.invalidate()
+            return report
+        finally:
+            await sqlalchemy_config.get_engine().dispose()
+            await close_pool()
+            await catalog_cache.close()
+
+    report = asyncio.run(_import())
+    click.echo(
+        f"{report.total_rows} filas: {report.inserted} insertadas, "
+        f"{report.updated} actualizadas, {len(report.errors)} con errores"
+    )
+    if errors_path is not None:
+        errors_path.write_text(json.dumps([asdict(error) for error in report.errors], ensure_ascii=False, indent=2))
+    else:
+        for error in report.errors[:20]:
+            click.echo(f"  línea {error.line} ({error.isbn}): {error.error}")
+
+
+@library_group.command(name="reconcile-review-stats")
+def reconcile_review_stats() -> None:
+    """Recompute review_count, rating_sum and the rating histogram of every book."""
+    from app.db import close_pool, sqlalchemy_config
+    from app.repositories.book import BookRepository
+    from app.response_cache import catalog_cache
+
+    async def _reconcile() -> list[int]:
+        try:
+            async with sqlalchemy_config.get_session() as session:
+                book_ids = await BookRepository(session=session).reconcile_review_stats()
+                await session.commit()
+            if book_ids:
+                await catalog_cache.invalidate()
+            return book_ids
+        finally:
+            await sqlalchemy_config.get_engine().dispose()
+            await close_pool()
+            await catalog_cache.close()
+
+    book_ids = asyncio.run(_reconcile())
+    click.echo(f"{len(book_ids)} libros corregidos")
+
+
+@library_group.command(name="generate-data")
+@click.option("--scale", type=float, default=1, show_default=True, help="1 ≈ 10 mil libros y 100 mil préstamos; 100 ≈ 10M préstamos.")
+@click.option("--seed", type=int, default=42, show_default=True, help="Misma escala y semilla generan los mismos datos.")
+@click.option("--reset", is_flag=True, help="Vaciar las tablas antes de generar (borra todos los datos).")
+def generate_data(scale: float, seed: int, reset: bool) -> None:
+    """Fill an empty database with synthetic, skewed library data using COPY."""
+    import time
+
+    from app.datagen import DataGenerator
+    from app.db import close_pool, sqlalchemy_config
+    from app.response_cache import catalog_cache
+
+    started = time.monotonic()
+
+    def progress(table: str, rows: int) -> None:
+        click.echo(f"  {table}: {rows} filas ({time.monotonic() - started:.0f}s)")
+
+    async def _generate() -> None:
+        try:
+            async with sqlalchemy_config.get_session() as session:
+                generator = DataGenerator(session, scale=scale, seed=seed)
+                if reset:
+                    await generator.reset()
+                elif not await generator.is_empty():
+                    raise click.ClickException("La base ya tiene datos; usa --reset para reemplazarlos.")
+                await generator.run(progress)
+            await catalog_cache.invalidate()
+        finally:
+            await sqlalchemy_config.get_engine().dispose()
+            await close_pool()
+            await catalog_cache.close()
+
+    asyncio.run(_generate())
+    click.echo(f"listo en {time.monotonic() - started:.0f}s")
+
+
+class LibraryCLIPlugin(CLIPluginProtocol):
+    """Registers the ``library`` command group in the Litestar CLI."""
+
+    def on_cli_init(self, cli: Group) -> None:
+        cli.add_command(library_group)
@@ -1,5 +1,8 @@
 """Application configuration using Pydantic Settings."""
 
+from decimal import Decimal
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -8,6 +11,45 @@ class Settings(BaseSettings):
     debug: bool = False
     jwt_secret: str = "secret123"
     database_url: str = "postgresql+psycopg:///bd2_library_db"
+    # réplica de lectura opcional para los GET
+    database_replica_url: str | None = None
+    # segundos de atraso de la réplica a partir de los cuales se lee del primario
+    db_replica_max_lag: float = 2
+    # cada cuántos segundos se revisa la salud y el atraso de la réplica
+    db_replica_check_interval: float = 5
+    # segundos que un cliente lee del primario después de escribir (read-your-writes)
+    db_replica_sticky_seconds: float = 10
+    # multa por día de atraso de un préstamo
+    fine_per_day: Decimal = Decimal("500")
+    # máximo de ids por llamada a los endpoints /batch
+    batch_max_ids: int = 100
+    # segundos que se reutiliza el resultado de /books/stats (0 = sin caché)
+    book_stats_cache_ttl: float = 0
+    # pool donde corre Argon2 para no bloquear el event loop
+    password_hash_executor: Literal["thread", "process"] = "thread"
+    password_hash_workers: int = 2
+    # caché de los usuarios autenticados (0 = sin caché); como el del catálogo, solo se
+    # activa con response_cache_redis_url, donde guarda la versión que invalidan las escrituras
+    principal_cache_ttl: float = 30
+    principal_cache_size: int = 1024
+    # caché HTTP del catálogo (0 = sin caché); solo se activa con un Redis (o compatible)
+    # compartido por todos los workers y la CLI, que guarda también la versión del catálogo
+    # (y la de los usuarios autenticados)
+    response_cache_ttl: int = 300
+    response_cache_redis_url: str | None = None
+    # pool de conexiones: "queue" (pool de SQLAlchemy), "psycopg" (psycopg_pool) o
+    # "null" (una conexión por sesión, para usar detrás de PgBouncer)
+    db_pool_mode: Literal["queue", "psycopg", "null"] = "queue"
+    db_pool_size: int = 10
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    # segundos antes de reemplazar una conexión (-1 = nunca)
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = False
+    # conexiones que se abren al arrancar para no pagar el connect en los primeros requests
+    db_pool_warmup: int = 2
+    # ejecuciones antes de que psycopg prepare una query (None = nunca, necesario con PgBouncer en modo transaction)
+    db_prepare_threshold: int | None = 5
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -4,6 +4,11 @@ from typing import Any
 
 from advanced_alchemy.exceptions import DuplicateKeyError, NotFoundError
 from litestar import Request, Response
+from sqlalchemy.exc import IntegrityError
+
+from app.repositories.fieldsets import InvalidFieldsError
+from app.repositories.loan import BulkLoanError
+from app.repositories.pagination import InvalidCursorError
 
 
 def not_found_error_handler(_: Request[Any, Any, Any], __: NotFoundError) -> Response[Any]:
@@ -14,9 +19,33 @@ def not_found_error_handler(_: Request[Any, Any, Any], __: NotFoundError) -> Res
     )
 
 
-def duplicate_error_handler(_: Request[Any, Any, Any], __: DuplicateKeyError) -> Response[Any]:
-    """Handle duplicate errors."""
+def duplicate_error_handler(_: Request[Any, Any, Any], __: DuplicateKeyError | IntegrityError) -> Response[Any]:
+    """Handle duplicate errors, also unique violations raised outside a repository."""
     return Response(
-        status_code=404,
-        content={"status_code": 404, "detail": "Already exists"},
+        status_code=409,
+        content={"status_code": 409, "detail": "Already exists"},
+    )
+
+
+def invalid_cursor_error_handler(_: Request[Any, Any, Any], exc: InvalidCursorError) -> Response[Any]:
+    """Handle malformed pagination cursors."""
+    return Response(
+        status_code=400,
+        content={"status_code": 400, "detail": str(exc)},
+    )
+
+
+def invalid_fields_error_handler(_: Request[Any, Any, Any], exc: InvalidFieldsError) -> Response[Any]:
+    """Handle unknown fields in ``?fields=``."""
+    return Response(
+        status_code=400,
+        content={"status_code": 400, "detail": str(exc)},
+    )
+
+
+def bulk_loan_error_handler(_: Request[Any, Any, Any], exc: BulkLoanError) -> Response[Any]:
+    """Handle all-or-nothing bulk loan operations that were rolled back."""
+    return Response(
+        status_code=409,
+        content={"status_code": 409, "detail": str(exc), "errors": exc.errors},
     )
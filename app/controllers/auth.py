@@ -9,10 +9,12 @@ from litestar.exceptions import HTTPException
 from litestar.params import Body
 from litestar.security.jwt import OAuth2Login
 
+from app.db import after_commit
 from app.dtos.user import UserLoginDTO
 from app.models import User
-from app.repositories.user import UserRepository, password_hasher, provide_user_repo
-from app.security import oauth2_auth
+from app.passwords import password_pool
+from app.repositories.user import UserRepository, provide_user_repo
+from app.security import oauth2_auth, principal_cache
 
 
 class AuthController(Controller):
@@ -32,10 +34,16 @@ class AuthController(Controller):
         users_repo: UserRepository,
     ) -> Response[OAuth2Login]:
         """Authenticate user and generate OAuth2 token."""
-        user = users_repo.get_one_or_none(username=data.username)
+        user = await users_repo.get_one_or_none(username=data.username)
 
         if user is not None:
-            if password_hasher.verify(data.password, user.password):
+            valid, new_hash = await password_pool.verify_and_update(data.password, user.password)
+            if valid:
+                # el hash se hizo con parámetros de Argon2 antiguos: se reemplaza
+                if new_hash is not None:
+                    user.password = new_hash
+                    await users_repo.update(user)
+                    await after_commit(principal_cache.invalidate)
                 return oauth2_auth.login(identifier=user.username)
 
         raise HTTPException(status_code=401, detail="Usuario o contraseña incorrectos")
@@ -5,16 +5,40 @@ from datetime import datetime
 
 from advanced_alchemy.exceptions import DuplicateKeyError, NotFoundError
 from advanced_alchemy.filters import LimitOffset
-from litestar import Controller, delete, get, patch, post
+from litestar import Controller, Request, delete, get, patch, post
 from litestar.di import Provide
 from litestar.dto import DTOData
+from litestar.pagination import CursorPagination
 from litestar.exceptions import HTTPException
 from litestar.params import Parameter
+from litestar.response import Stream
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.controllers import duplicate_error_handler, not_found_error_handler
-from app.dtos.book import BookCreateDTO, BookReadDTO, BookUpdateDTO
-from app.models import Book, BookStats
-from app.repositories.book import BookRepository, provide_book_repo
+from app.book_import import BookImporter, BookImportReport, iter_lines, iter_records, validate_new_book
+from app.db import after_commit
+from app.export import (
+    BOOK_EXPORT_COLUMNS,
+    EXPORT_MEDIA_TYPES,
+    ExportFormat,
+    book_export_statement,
+    encode_rows,
+    stream_rows,
+)
+from app.controllers import (
+    duplicate_error_handler,
+    invalid_cursor_error_handler,
+    invalid_fields_error_handler,
+    not_found_error_handler,
+)
+from app.dtos.book import BookCreateDTO, BookReadDTO, BookSummaryDTO, BookUpdateDTO
+from app.models import Book, BookStats, book_categories
+from app.repositories.batch import BatchResult, provide_batch_ids
+from app.repositories.fieldsets import InvalidFieldsError
+from app.repositories.pagination import InvalidCursorError, KeysetParams, provide_keyset_params
+from app.repositories.book import BookRepository, book_stats_cache, provide_book_repo, provide_book_summary_repo
+from app.response_cache import ResponseCacheMiddleware, catalog_cache
 
 
 class BookController(Controller):
@@ -23,53 +47,90 @@ class BookController(Controller):
     path = "/books"
     tags = ["books"]
     return_dto = BookReadDTO
-    dependencies = {"books_repo": Provide(provide_book_repo)}
+    dependencies = {
+        "books_repo": Provide(provide_book_repo),
+        "book_summaries": Provide(provide_book_summary_repo),
+        "keyset": Provide(provide_keyset_params),
+        "batch_ids": Provide(provide_batch_ids),
+    }
     exception_handlers = {
         NotFoundError: not_found_error_handler,
         DuplicateKeyError: duplicate_error_handler,
+        # la importación no pasa por el repositorio: un título que otro request insertó a la vez
+        IntegrityError: duplicate_error_handler,
+        InvalidCursorError: invalid_cursor_error_handler,
+        InvalidFieldsError: invalid_fields_error_handler,
     }
 
-    @get("/")
-    async def list_books(self, books_repo: BookRepository) -> Sequence[Book]:
-        """Get all books."""
-        return books_repo.list()
+    @get("/", middleware=[ResponseCacheMiddleware], return_dto=BookSummaryDTO)
+    async def list_books(self, book_summaries: BookRepository, keyset: KeysetParams) -> CursorPagination[str, Book]:
+        """Get a page of book summaries; ``?fields=`` picks the columns."""
+        return await book_summaries.paginate(params=keyset)
 
-    @get("/{id:int}")
+    @get("/{id:int}", middleware=[ResponseCacheMiddleware])
     async def get_book(self, id: int, books_repo: BookRepository) -> Book:
         """Get a book by ID."""
-        return books_repo.get(id)
+        return await books_repo.get(id)
+
+    @get("/batch")
+    async def get_books_batch(self, batch_ids: list[int], books_repo: BookRepository) -> BatchResult[Book]:
+        """Get several books by ID (``?ids=1,2,3``) in one query; unknown ids come back in ``missing``."""
+        return await books_repo.get_many(batch_ids)
 
     @post("/", dto=BookCreateDTO)
     async def create_book( self, data: DTOData[Book], books_repo: BookRepository) -> Book:
         """Create a new book."""
         payload = data.as_builtins()
 
-        # año de publicación válido
-        current_year = datetime.now().year
-        published_year = payload.get("published_year")
-        if published_year is None or not (1000 <= published_year <= current_year):
-            raise HTTPException(
-                detail=f"El año de publicación debe estar entre 1000 y {current_year}",
-                status_code=400,
-            )
+        # año de publicación, stock > 0 e idioma de 2 letras (mismas reglas que la importación masiva)
+        error = validate_new_book(payload)
+        if error is not None:
+            raise HTTPException(detail=error, status_code=400)
 
-        # stock > 0
-        stock = payload.get("stock", 1)
-        if stock is None or stock <= 0:
-            raise HTTPException(
-                detail="El stock debe ser mayor que 0",
-                status_code=400,
-            )
+        book = await books_repo.add(data.create_instance())
+        await after_commit(book_stats_cache.invalidate)
+        await after_commit(catalog_cache.invalidate)
+        # recargar con las relaciones que serializa BookReadDTO
+        return await books_repo.get(book.id)
 
-        # idioma
-        language = payload.get("language")
-        if not isinstance(language, str) or len(language) != 2:
-            raise HTTPException(
-                detail="El idioma debe ser un código de 2 letras (por ejemplo: 'es', 'en', 'fr').",
-                status_code=400,
+    @post("/import", status_code=200, request_max_body_size=None)
+    async def import_books(self, request: Request, db_session: AsyncSession) -> BookImportReport:
+        """Bulk import books from a CSV (text/csv) or NDJSON (application/x-ndjson) body.
+
+        Los libros se insertan o actualizan por isbn (en uno existente, una celda vacía o una columna
+        que falta no cambian ese dato); las filas inválidas vienen en ``errors``.
+        Todo el archivo va en la transacción del request: o se importan todos los lotes o ninguno.
+        """
+        fmt = "ndjson" if "json" in request.headers.get("content-type", "") else "csv"
+        records = iter_records(iter_lines(request.stream()), fmt)
+        report = await BookImporter(db_session).run(records)
+        await after_commit(book_stats_cache.invalidate)
+        await after_commit(catalog_cache.invalidate)
+        return report
+
+    @get("/export")
+    async def export_books(
+        self,
+        format: ExportFormat = "ndjson",
+        language: str | None = None,
+        category_id: int | None = None,
+    ) -> Stream:
+        """Stream the catalog as NDJSON or CSV, optionally filtered by language or category."""
+        stmt = book_export_statement()
+        if language is not None:
+            stmt = stmt.where(Book.language == language)
+        if category_id is not None:
+            stmt = stmt.where(
+                Book.id.in_(
+                    select(book_categories.c.book_id).where(book_categories.c.category_id == category_id)
+                )
             )
 
-        return books_repo.add(data.create_instance())
+        return Stream(
+            encode_rows(stream_rows(stmt), format, BOOK_EXPORT_COLUMNS),
+            media_type=EXPORT_MEDIA_TYPES[format],
+            headers={"Content-Disposition": f'attachment; filename="books.{format}"'},
+        )
 
     @patch("/{id:int}", dto=BookUpdateDTO)
     async def update_book( self, id: int, data: DTOData[Book], books_repo: BookRepository) -> Book:
@@ -102,22 +163,27 @@ class BookController(Controller):
                     status_code=400,
                 )
 
-        book, _ = books_repo.get_and_update(match_fields="id", id=id, **payload)
+        book, _ = await books_repo.get_and_update(match_fields="id", id=id, **payload)
+        await after_commit(book_stats_cache.invalidate)
+        await after_commit(catalog_cache.invalidate)
         return book
 
     @delete("/{id:int}")
     async def delete_book(self, id: int, books_repo: BookRepository) -> None:
         """Delete a book by ID."""
-        books_repo.delete(id)
+        await books_repo.delete(id)
+        await after_commit(book_stats_cache.invalidate)
+        await after_commit(catalog_cache.invalidate)
 
-    @get("/search/")
-    async def search_book_by_title(
+    @get("/search")
+    async def search_books(
         self,
-        title: str,
+        q: Annotated[str, Parameter(query="q", min_length=1)],
+        limit: Annotated[int, Parameter(query="limit", ge=1, le=50, default=20)],
         books_repo: BookRepository,
     ) -> Sequence[Book]:
-        """Search books by title."""
-        return books_repo.list(Book.title.ilike(f"%{title}%"))
+        """Search books by title, author, publisher or description, best matches first."""
+        return await books_repo.search(q, limit=limit)
 
     @get("/filter")
     async def filter_books_by_year(
@@ -127,12 +193,12 @@ class BookController(Controller):
         books_repo: BookRepository,
     ) -> Sequence[Book]:
         """Filter books by published year."""
-        return books_repo.list(Book.published_year.between(year_from, to))
+        return await books_repo.list(Book.published_year.between(year_from, to))
 
-    @get("/recent")
+    @get("/recent", middleware=[ResponseCacheMiddleware])
     async def get_recent_books( self, limit: Annotated[int, Parameter(query="limit", default=10, ge=1, le=50)], books_repo: BookRepository) -> Sequence[Book]:
         """Get most recent books."""
-        return books_repo.list(
+        return await books_repo.list(
             LimitOffset(offset=0, limit=limit),
             order_by=Book.created_at.desc(),
         )
@@ -140,53 +206,55 @@ class BookController(Controller):
     @get("/stats")
     async def get_book_stats(self,books_repo: BookRepository) -> BookStats:
         """Get statistics about books."""
-        total_books = books_repo.count()
-        if total_books == 0:
-            return BookStats(
-                total_books=0,
-                average_pages=0,
-                oldest_publication_year=None,
-                newest_publication_year=None,
-            )
+        stats = book_stats_cache.get()
+        if stats is None:
+            generation = book_stats_cache.generation
+            stats = await books_repo.get_stats()
+            book_stats_cache.set(stats, generation)
+        return stats
 
-        books = books_repo.list()
+    @get("/available", return_dto=BookSummaryDTO)
+    async def get_available_books(self,book_summaries: BookRepository,keyset: KeysetParams) -> CursorPagination[str, Book]:
+        """Get a page of summaries of books with stock > 0; ``?fields=`` picks the columns."""
+        return await book_summaries.get_available_books(keyset)
 
-        average_pages = sum(book.pages for book in books) / total_books
-        oldest_year = min(book.published_year for book in books)
-        newest_year = max(book.published_year for book in books)
+    @get("/by-category/{category_id:int}", return_dto=BookSummaryDTO)
+    async def get_books_by_category(self,category_id: int,book_summaries: BookRepository,keyset: KeysetParams) -> CursorPagination[str, Book]:
+        """Get a page of summaries of books in a category; ``?fields=`` picks the columns."""
+        return await book_summaries.find_by_category(category_id, keyset)
 
-        return BookStats(
-            total_books=total_books,
-            average_pages=average_pages,
-            oldest_publication_year=oldest_year,
-            newest_publication_year=newest_year,
-        )
-
-    @get("/available")
-    async def get_available_books(self,books_repo: BookRepository) -> Sequence[Book]:
-        """Get books with stock > 0."""
-        return books_repo.get_available_books()
-
-    @get("/by-category/{category_id:int}")
-    async def get_books_by_category(self,category_id: int,books_repo: BookRepository) -> Sequence[Book]:
-        """Get books that belong to a given category."""
-        return books_repo.find_by_category(category_id)
-
-    @get("/most-reviewed")
+    @get("/most-reviewed", middleware=[ResponseCacheMiddleware])
     async def get_most_reviewed_books(self,limit: Annotated[int, Parameter(query="limit", ge=1, le=50, default=10)],books_repo: BookRepository) -> Sequence[Book]:
         """Get books ordered by number of reviews (desc)."""
-        return books_repo.get_most_reviewed_books(limit=limit)
+        return await books_repo.get_most_reviewed_books(limit=limit)
+
+    @get("/top-rated", middleware=[ResponseCacheMiddleware])
+    async def get_top_rated_books(
+        self,
+        books_repo: BookRepository,
+        limit: Annotated[int, Parameter(query="limit", ge=1, le=50)] = 10,
+        min_reviews: Annotated[int, Parameter(query="min_reviews", ge=1)] = 1,
+    ) -> Sequence[Book]:
+        """Get books ordered by average rating (desc)."""
+        return await books_repo.get_top_rated_books(limit=limit, min_reviews=min_reviews)
 
     @patch("/{id:int}/stock")
     async def update_book_stock(self,id: int,quantity: Annotated[int, Parameter(query="quantity")],books_repo: BookRepository) -> Book:
         """Update stock for a book (quantity can be positive or negative)."""
         try:
-            return books_repo.update_stock(book_id=id, quantity=quantity)
+            book = await books_repo.update_stock(book_id=id, quantity=quantity)
         except ValueError as exc:
             # stock no puede quedar negativo
             raise HTTPException(status_code=400, detail=str(exc))
+        await after_commit(catalog_cache.invalidate)
+        return book
 
     @get("/search/author")
-    async def search_books_by_author(self,author_name: Annotated[str, Parameter(query="author_name")],books_repo: BookRepository) -> Sequence[Book]:
-        """Search books by author name (partial match)."""
-        return books_repo.search_by_author(author_name)
+    async def search_books_by_author(
+        self,
+        author_name: Annotated[str, Parameter(query="author_name", min_length=1)],
+        limit: Annotated[int, Parameter(query="limit", ge=1, le=50, default=20)],
+        books_repo: BookRepository,
+    ) -> Sequence[Book]:
+        """Search books by author name (partial match), closest authors first."""
+        return await books_repo.search_by_author(author_name, limit=limit)
@@ -1,16 +1,19 @@
 """Controller for Category endpoints."""
 
-from typing import Sequence
-
 from advanced_alchemy.exceptions import DuplicateKeyError, NotFoundError
 from litestar import Controller, delete, get, patch, post
 from litestar.di import Provide
 from litestar.dto import DTOData
+from litestar.pagination import CursorPagination
 
-from app.controllers import duplicate_error_handler, not_found_error_handler
+from app.controllers import duplicate_error_handler, invalid_cursor_error_handler, not_found_error_handler
+from app.db import after_commit
 from app.dtos.category import CategoryCreateDTO, CategoryReadDTO, CategoryUpdateDTO
 from app.models import Category
+from app.repositories.pagination import InvalidCursorError, KeysetParams, provide_keyset_params
+from app.repositories.book import book_stats_cache
 from app.repositories.category import CategoryRepository, provide_category_repo
+from app.response_cache import ResponseCacheMiddleware, catalog_cache
 
 
 class CategoryController(Controller):
@@ -19,21 +22,25 @@ class CategoryController(Controller):
     path = "/categories"
     tags = ["categories"]
     return_dto = CategoryReadDTO
-    dependencies = {"categories_repo": Provide(provide_category_repo)}
+    dependencies = {
+        "categories_repo": Provide(provide_category_repo),
+        "keyset": Provide(provide_keyset_params),
+    }
     exception_handlers = {
         NotFoundError: not_found_error_handler,
         DuplicateKeyError: duplicate_error_handler,
+        InvalidCursorError: invalid_cursor_error_handler,
     }
 
-    @get("/")
-    async def list_categories(self, categories_repo: CategoryRepository) -> Sequence[Category]:
-        """Get all categories."""
-        return categories_repo.list()
+    @get("/", middleware=[ResponseCacheMiddleware])
+    async def list_categories(self, categories_repo: CategoryRepository, keyset: KeysetParams) -> CursorPagination[str, Category]:
+        """Get a page of categories."""
+        return await categories_repo.paginate(params=keyset)
 
-    @get("/{id:int}")
+    @get("/{id:int}", middleware=[ResponseCacheMiddleware])
     async def get_category(self, id: int, categories_repo: CategoryRepository) -> Category:
         """Get a category by ID."""
-        return categories_repo.get(id)
+        return await categories_repo.get(id)
 
     @post("/", dto=CategoryCreateDTO)
     async def create_category(
@@ -42,7 +49,10 @@ class CategoryController(Controller):
         categories_repo: CategoryRepository,
     ) -> Category:
         """Create a new category."""
-        return categories_repo.add(data.create_instance())
+        category = await categories_repo.add(data.create_instance())
+        await after_commit(book_stats_cache.invalidate)
+        await after_commit(catalog_cache.invalidate)
+        return category
 
     @patch("/{id:int}", dto=CategoryUpdateDTO)
     async def update_category(
@@ -52,14 +62,18 @@ class CategoryController(Controller):
         categories_repo: CategoryRepository,
     ) -> Category:
         """Update a category by ID."""
-        category, _ = categories_repo.get_and_update(
+        category, _ = await categories_repo.get_and_update(
             match_fields="id",
             id=id,
             **data.as_builtins(),
         )
+        await after_commit(book_stats_cache.invalidate)
+        await after_commit(catalog_cache.invalidate)
         return category
 
     @delete("/{id:int}")
     async def delete_category(self, id: int, categories_repo: CategoryRepository) -> None:
         """Delete a category by ID."""
-        categories_repo.delete(id)
+        await categories_repo.delete(id)
+        await after_commit(book_stats_cache.invalidate)
+        await after_commit(catalog_cache.invalidate)
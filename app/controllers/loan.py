@@ -1,17 +1,44 @@
 """Controller for Loan endpoints."""
 
-from typing import Sequence
+from typing import Annotated, Sequence
 from datetime import date, timedelta
+from decimal import Decimal
 
 from advanced_alchemy.exceptions import DuplicateKeyError, NotFoundError
 from litestar import Controller, delete, get, patch, post
 from litestar.di import Provide
 from litestar.dto import DTOData
-
-from app.controllers import duplicate_error_handler, not_found_error_handler
-from app.dtos.loan import LoanCreateDTO, LoanReadDTO, LoanUpdateDTO
-from app.models import Loan, LoanStatus
-from app.repositories.loan import LoanRepository, provide_loan_repo
+from litestar.exceptions import HTTPException
+from litestar.pagination import CursorPagination
+from litestar.params import Parameter
+from litestar.response import Stream
+
+from app.controllers import (
+    bulk_loan_error_handler,
+    duplicate_error_handler,
+    invalid_cursor_error_handler,
+    invalid_fields_error_handler,
+    not_found_error_handler,
+)
+from app.db import after_commit
+from app.export import (
+    EXPORT_MEDIA_TYPES,
+    LOAN_EXPORT_COLUMNS,
+    ExportFormat,
+    encode_rows,
+    loan_export_statement,
+    stream_rows,
+)
+from app.dtos.loan import LoanCreateDTO, LoanReadDTO, LoanSummaryDTO, LoanUpdateDTO
+from app.models import BulkCheckout, BulkLoanResult, BulkReturn, Loan, LoanStatus
+from app.repositories.batch import BatchResult, check_batch_size, provide_batch_ids
+from app.repositories.fieldsets import InvalidFieldsError
+from app.repositories.pagination import InvalidCursorError, KeysetParams, provide_keyset_params
+from app.repositories.loan import FINE_PER_DAY, BulkLoanError, LoanRepository, provide_loan_repo, provide_loan_summary_repo
+from app.response_cache import catalog_cache
+
+# plazo de un préstamo
+LOAN_PERIOD = timedelta(days=14)
 
 
 class LoanController(Controller):
@@ -20,21 +47,63 @@ class LoanController(Controller):
     path = "/loans"
     tags = ["loans"]
     return_dto = LoanReadDTO
-    dependencies = {"loans_repo": Provide(provide_loan_repo)}
+    dependencies = {
+        "loans_repo": Provide(provide_loan_repo),
+        "loan_summaries": Provide(provide_loan_summary_repo),
+        "keyset": Provide(provide_keyset_params),
+        "batch_ids": Provide(provide_batch_ids),
+    }
     exception_handlers = {
         NotFoundError: not_found_error_handler,
         DuplicateKeyError: duplicate_error_handler,
+        InvalidCursorError: invalid_cursor_error_handler,
+        InvalidFieldsError: invalid_fields_error_handler,
+        BulkLoanError: bulk_loan_error_handler,
     }
 
-    @get("/")
-    async def list_loans(self, loans_repo: LoanRepository) -> Sequence[Loan]:
-        """Get all loans."""
-        return loans_repo.list()
+    @get("/", return_dto=LoanSummaryDTO)
+    async def list_loans(self, loan_summaries: LoanRepository, keyset: KeysetParams) -> CursorPagination[str, Loan]:
+        """Get a page of loan summaries; ``?fields=`` picks the columns."""
+        return await loan_summaries.paginate(params=keyset)
+
+    @get("/export")
+    async def export_loans(
+        self,
+        format: ExportFormat = "ndjson",
+        status: LoanStatus | None = None,
+        user_id: int | None = None,
+        from_date: Annotated[date | None, Parameter(query="from")] = None,
+        to_date: Annotated[date | None, Parameter(query="to")] = None,
+    ) -> Stream:
+        """Stream every loan matching the filters as NDJSON or CSV.
+
+        Las fechas filtran por loan_dt (ambos extremos incluidos).
+        """
+        stmt = loan_export_statement()
+        if status is not None:
+            stmt = stmt.where(Loan.status == status)
+        if user_id is not None:
+            stmt = stmt.where(Loan.user_id == user_id)
+        if from_date is not None:
+            stmt = stmt.where(Loan.loan_dt >= from_date)
+        if to_date is not None:
+            stmt = stmt.where(Loan.loan_dt <= to_date)
+
+        return Stream(
+            encode_rows(stream_rows(stmt), format, LOAN_EXPORT_COLUMNS),
+            media_type=EXPORT_MEDIA_TYPES[format],
+            headers={"Content-Disposition": f'attachment; filename="loans.{format}"'},
+        )
 
     @get("/{id:int}")
     async def get_loan(self, id: int, loans_repo: LoanRepository) -> Loan:
         """Get a loan by ID."""
-        return loans_repo.get(id)
+        return await loans_repo.get(id)
+
+    @get("/batch")
+    async def get_loans_batch(self, batch_ids: list[int], loans_repo: LoanRepository) -> BatchResult[Loan]:
+        """Get several loans by ID (``?ids=1,2,3``) in one query; unknown ids come back in ``missing``."""
+        return await loans_repo.get_many(batch_ids)
 
     @post("/", dto=LoanCreateDTO)
     async def create_loan(self,data: DTOData[Loan],loans_repo: LoanRepository) -> Loan:
@@ -43,6 +112,7 @@ class LoanController(Controller):
         - Calcula due_date como loan_dt + 14 días.
         - Deja fine_amount en None.
         - Deja status en ACTIVE.
+        - Descuenta una unidad del stock del libro (400 si no hay stock).
         """
         loan = data.create_instance()
 
@@ -51,13 +121,57 @@ class LoanController(Controller):
             loan.loan_dt = date.today()
 
         # due_date = 14 días después de loan_dt
-        loan.due_date = loan.loan_dt + timedelta(days=14)
+        loan.due_date = loan.loan_dt + LOAN_PERIOD
 
         # Por claridad hacemos explícitos estos defaults
         loan.status = LoanStatus.ACTIVE
         loan.fine_amount = None
 
-        return loans_repo.add(loan)
+        try:
+            loan = await loans_repo.checkout(loan)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        # el stock y loan_count del libro son parte del catálogo cacheado
+        await after_commit(catalog_cache.invalidate)
+        return loan
+
+    @post("/bulk-checkout")
+    async def bulk_checkout(self, data: BulkCheckout, loans_repo: LoanRepository) -> BulkLoanResult[Loan]:
+        """Lend several books to one user in one transaction (e.g. a self-service kiosk).
+
+        Mismas reglas que POST /loans/ para cada libro. Con ``atomic`` (por defecto)
+        un libro sin stock o inexistente cancela todo con 409; con ``atomic: false``
+        se prestan los demás y los fallidos vuelven en ``errors``.
+        """
+        check_batch_size(data.book_ids)
+        loan_dt = data.loan_dt or date.today()
+        loans = [
+            Loan(
+                user_id=data.user_id,
+                book_id=book_id,
+                loan_dt=loan_dt,
+                due_date=loan_dt + LOAN_PERIOD,
+                status=LoanStatus.ACTIVE,
+                fine_amount=None,
+            )
+            for book_id in data.book_ids
+        ]
+        result = await loans_repo.checkout_many(loans, atomic=data.atomic)
+        await after_commit(catalog_cache.invalidate)
+        return result
+
+    @post("/bulk-return")
+    async def bulk_return(self, data: BulkReturn, loans_repo: LoanRepository) -> BulkLoanResult[Loan]:
+        """Process several book returns in one transaction.
+
+        Con ``atomic`` (por defecto) un préstamo inexistente o ya devuelto cancela
+        todo con 409; con ``atomic: false`` se devuelven los demás y los fallidos
+        vuelven en ``errors``.
+        """
+        check_batch_size(data.loan_ids)
+        result = await loans_repo.return_books(data.loan_ids, atomic=data.atomic)
+        await after_commit(catalog_cache.invalidate)
+        return result
 
     @patch("/{id:int}", dto=LoanUpdateDTO)
     async def update_loan(self,id: int,data: DTOData[Loan],loans_repo: LoanRepository) -> Loan:
@@ -66,36 +180,61 @@ class LoanController(Controller):
         El DTO solo permite actualizar 'status', así que no se tocan otros campos.
         """
         payload = data.as_builtins()
-        loan, _ = loans_repo.get_and_update(match_fields="id", id=id, **payload)
+        loan, _ = await loans_repo.get_and_update(match_fields="id", id=id, **payload)
         return loan
 
     @delete("/{id:int}")
     async def delete_loan(self, id: int, loans_repo: LoanRepository) -> None:
         """Delete a loan by ID."""
-        loans_repo.delete(id)
-
-    @get("/active")
-    async def get_active_loans(self,loans_repo: LoanRepository) -> Sequence[Loan]:
-        """Get all ACTIVE loans."""
-        return loans_repo.get_active_loans()
-
-    @get("/overdue")
-    async def get_overdue_loans(self,loans_repo: LoanRepository) -> Sequence[Loan]:
-        """Get all overdue loans, marking ACTIVE + vencidos como OVERDUE."""
-        return loans_repo.get_overdue_loans()
+        await loans_repo.delete(id)
+        await after_commit(catalog_cache.invalidate)
+
+    @get("/active", return_dto=LoanSummaryDTO)
+    async def get_active_loans(self,loan_summaries: LoanRepository) -> Sequence[Loan]:
+        """Get summaries of all ACTIVE loans; ``?fields=`` picks the columns."""
+        return await loan_summaries.get_active_loans()
+
+    @get("/overdue", return_dto=LoanSummaryDTO)
+    async def get_overdue_loans(self,loan_summaries: LoanRepository) -> Sequence[Loan]:
+        """Get summaries of all overdue loans (ACTIVE past due or already marked OVERDUE)."""
+        return await loan_summaries.get_overdue_loans()
+
+    @post("/overdue/sweep")
+    async def sweep_overdue_loans(self,loans_repo: LoanRepository) -> dict:
+        """Mark ACTIVE loans past their due date as OVERDUE."""
+        loan_ids = await loans_repo.mark_overdue_loans()
+        return {"updated": len(loan_ids), "loan_ids": loan_ids}
+
+    @get("/fines")
+    async def get_fine_totals(self, loans_repo: LoanRepository, status: LoanStatus | None = None) -> dict:
+        """Total fines across the library, per loan status.
+
+        Préstamos abiertos acumulan multa hasta hoy; los devueltos, hasta su return_dt.
+        """
+        rows = await loans_repo.get_fine_totals(status)
+        return {
+            "fine_per_day": str(FINE_PER_DAY),
+            "loans": sum(row.loans for row in rows),
+            "total": str(sum((row.total for row in rows), Decimal("0"))),
+            "by_status": [
+                {"status": row.status, "loans": row.loans, "total": str(row.total)} for row in rows
+            ],
+        }
 
     @get("/{id:int}/fine")
     async def get_loan_fine(self,id: int,loans_repo: LoanRepository) -> dict:
         """Calculate fine for a loan."""
-        fine = loans_repo.calculate_fine(id)
+        fine = await loans_repo.calculate_fine(id)
         return {"loan_id": id, "fine": str(fine)}
 
     @post("/{id:int}/return")
     async def return_book(self,id: int,loans_repo: LoanRepository) -> Loan:
         """Process a book return for a given loan."""
-        return loans_repo.return_book(id)
+        loan = await loans_repo.return_book(id)
+        await after_commit(catalog_cache.invalidate)
+        return loan
 
-    @get("/user/{user_id:int}")
-    async def get_user_loan_history(self,user_id: int,loans_repo: LoanRepository) -> Sequence[Loan]:
-        """Get full loan history for a user, ordered by loan date."""
-        return loans_repo.get_user_loan_history(user_id)
+    @get("/user/{user_id:int}", return_dto=LoanSummaryDTO)
+    async def get_user_loan_history(self,user_id: int,loan_summaries: LoanRepository,keyset: KeysetParams) -> CursorPagination[str, Loan]:
+        """Get a page of a user's loan history, ordered by loan date; ``?fields=`` picks the columns."""
+        return await loan_summaries.get_user_loan_history(user_id, keyset)
@@ -0,0 +1,17 @@
+"""Controller for the Prometheus metrics endpoint."""
+
+from litestar import Controller, MediaType, get
+
+from app.metrics import registry
+
+
+class MetricsController(Controller):
+    """Exposes the process metrics for Prometheus."""
+
+    path = "/metrics"
+    tags = ["metrics"]
+
+    @get("/", media_type=MediaType.TEXT, include_in_schema=False)
+    async def metrics(self) -> str:
+        """Render request, SQL, pool and Argon2 metrics in the Prometheus text format."""
+        return registry.render()
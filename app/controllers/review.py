@@ -1,17 +1,19 @@
 """Controller for Review endpoints."""
 
-from typing import Sequence
-
 from advanced_alchemy.exceptions import DuplicateKeyError, NotFoundError
 from litestar import Controller, delete, get, patch, post
 from litestar.di import Provide
 from litestar.dto import DTOData
+from litestar.pagination import CursorPagination
 from litestar.exceptions import HTTPException
 
-from app.controllers import duplicate_error_handler, not_found_error_handler
+from app.controllers import duplicate_error_handler, invalid_cursor_error_handler, not_found_error_handler
+from app.db import after_commit
 from app.dtos.review import ReviewCreateDTO, ReviewReadDTO, ReviewUpdateDTO
 from app.models import Review
+from app.repositories.pagination import InvalidCursorError, KeysetParams, provide_keyset_params
 from app.repositories.review import ReviewRepository, provide_review_repo
+from app.response_cache import catalog_cache
 
 
 class ReviewController(Controller):
@@ -20,21 +22,25 @@ class ReviewController(Controller):
     path = "/reviews"
     tags = ["reviews"]
     return_dto = ReviewReadDTO
-    dependencies = {"reviews_repo": Provide(provide_review_repo)}
+    dependencies = {
+        "reviews_repo": Provide(provide_review_repo),
+        "keyset": Provide(provide_keyset_params),
+    }
     exception_handlers = {
         NotFoundError: not_found_error_handler,
         DuplicateKeyError: duplicate_error_handler,
+        InvalidCursorError: invalid_cursor_error_handler,
     }
 
     @get("/")
-    async def list_reviews(self, reviews_repo: ReviewRepository) -> Sequence[Review]:
-        """Get all reviews."""
-        return reviews_repo.list()
+    async def list_reviews(self, reviews_repo: ReviewRepository, keyset: KeysetParams) -> CursorPagination[str, Review]:
+        """Get a page of reviews."""
+        return await reviews_repo.paginate(params=keyset)
 
     @get("/{id:int}")
     async def get_review(self, id: int, reviews_repo: ReviewRepository) -> Review:
         """Get a review by ID."""
-        return reviews_repo.get(id)
+        return await reviews_repo.get(id)
 
     @post("/", dto=ReviewCreateDTO)
     async def create_review(
@@ -50,8 +56,11 @@ class ReviewController(Controller):
         if rating is None or not (1 <= rating <= 5):
             raise HTTPException(status_code=400, detail="Rating must be between 1 and 5")
 
-        review = Review(**payload)
-        return reviews_repo.add(review)
+        # también suma el rating a los agregados del libro
+        review = await reviews_repo.add_review(Review(**payload))
+        # review_count y "más reseñados" dependen de las reseñas
+        await after_commit(catalog_cache.invalidate)
+        return review
 
     @patch("/{id:int}", dto=ReviewUpdateDTO)
     async def update_review(
@@ -69,14 +78,12 @@ class ReviewController(Controller):
             if not (1 <= rating <= 5):
                 raise HTTPException(status_code=400, detail="Rating must be between 1 and 5")
 
-        review, _ = reviews_repo.get_and_update(
-            match_fields="id",
-            id=id,
-            **payload,
-        )
+        review = await reviews_repo.update_review(id, **payload)
+        await after_commit(catalog_cache.invalidate)
         return review
 
     @delete("/{id:int}")
     async def delete_review(self, id: int, reviews_repo: ReviewRepository) -> None:
         """Delete a review by ID."""
-        reviews_repo.delete(id)
+        await reviews_repo.delete_review(id)
+        await after_commit(catalog_cache.invalidate)
@@ -1,18 +1,25 @@
 """Controller for User endpoints."""
 
-from typing import Sequence
 import re # Para validar el formato de los emails
+from decimal import Decimal
 
 from advanced_alchemy.exceptions import DuplicateKeyError, NotFoundError
 from litestar import Controller, delete, get, patch, post
 from litestar.di import Provide
 from litestar.dto import DTOData
+from litestar.pagination import CursorPagination
 from litestar.exceptions import HTTPException
 
-from app.controllers import duplicate_error_handler, not_found_error_handler
+from app.controllers import duplicate_error_handler, invalid_cursor_error_handler, not_found_error_handler
+from app.db import after_commit
 from app.dtos.user import UserCreateDTO, UserReadDTO, UserUpdateDTO
-from app.models import PasswordUpdate, User
+from app.models import LoanStatus, PasswordUpdate, User
+from app.passwords import password_pool
+from app.repositories.batch import BatchResult, provide_batch_ids
+from app.repositories.loan import FINE_PER_DAY, LoanRepository, provide_loan_repo
+from app.repositories.pagination import InvalidCursorError, KeysetParams, provide_keyset_params
 from app.repositories.user import UserRepository, provide_user_repo
+from app.security import principal_cache
 
 # Validación de los emails
 EMAIL_REGEX = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
@@ -27,21 +34,61 @@ class UserController(Controller):
     path = "/users"
     tags = ["users"]
     return_dto = UserReadDTO
-    dependencies = {"users_repo": Provide(provide_user_repo)}
+    dependencies = {
+        "users_repo": Provide(provide_user_repo),
+        "loans_repo": Provide(provide_loan_repo),
+        "keyset": Provide(provide_keyset_params),
+        "batch_ids": Provide(provide_batch_ids),
+    }
     exception_handlers = {
         NotFoundError: not_found_error_handler,
         DuplicateKeyError: duplicate_error_handler,
+        InvalidCursorError: invalid_cursor_error_handler,
     }
 
     @get("/")
-    async def list_users(self, users_repo: UserRepository) -> Sequence[User]:
-        """Get all users."""
-        return users_repo.list()
+    async def list_users(self, users_repo: UserRepository, keyset: KeysetParams) -> CursorPagination[str, User]:
+        """Get a page of users."""
+        return await users_repo.paginate(params=keyset)
 
     @get("/{id:int}")
     async def get_user(self, id: int, users_repo: UserRepository) -> User:
         """Get a user by ID."""
-        return users_repo.get(id)
+        return await users_repo.get(id)
+
+    @get("/batch")
+    async def get_users_batch(self, batch_ids: list[int], users_repo: UserRepository) -> BatchResult[User]:
+        """Get several users by ID (``?ids=1,2,3``) in one query; unknown ids come back in ``missing``."""
+        return await users_repo.get_many(batch_ids)
+
+    @get("/{id:int}/fines")
+    async def get_user_fines(
+        self, id: int, users_repo: UserRepository, loans_repo: LoanRepository, status: LoanStatus | None = None
+    ) -> dict:
+        """Fines of every loan of a user, with the total owed.
+
+        Préstamos abiertos acumulan multa hasta hoy; los devueltos, hasta su return_dt.
+        """
+        # 404 si el usuario no existe, en vez de una lista vacía
+        await users_repo.get(id)
+        rows = await loans_repo.get_user_fines(id, status)
+        return {
+            "user_id": id,
+            "fine_per_day": str(FINE_PER_DAY),
+            "total": str(sum((row.fine for row in rows), Decimal("0"))),
+            "loans": [
+                {
+                    "loan_id": row.loan_id,
+                    "book_id": row.book_id,
+                    "status": row.status,
+                    "due_date": row.due_date,
+                    "return_dt": row.return_dt,
+                    "days_late": row.days_late,
+                    "fine": str(row.fine),
+                }
+                for row in rows
+            ],
+        }
 
     @post("/", dto=UserCreateDTO)
     async def create_user(self, data: DTOData[User], users_repo: UserRepository) -> User:
@@ -56,7 +103,8 @@ class UserController(Controller):
                 status_code=400,
             )
 
-        return users_repo.add_with_hashed_password(data)
+        user = await users_repo.add_with_hashed_password(data)
+        return await users_repo.get(user.id)
 
 
     @patch("/{id:int}", dto=UserUpdateDTO)
@@ -72,25 +120,29 @@ class UserController(Controller):
                     status_code=400,
                 )
 
-        user, _ = users_repo.get_and_update(match_fields="id", id=id, **payload)
+        user, _ = await users_repo.get_and_update(match_fields="id", id=id, **payload)
+        await after_commit(principal_cache.invalidate)
         return user
 
 
     @post("/{id:int}/update-password", status_code=204)
     async def update_password(self,id: int,data: PasswordUpdate,users_repo: UserRepository) -> None:
         """Update a user's password."""
-        user = users_repo.get(id)
+        user = await users_repo.get(id)
 
-        if user.password != data.current_password:
+        valid, _ = await password_pool.verify_and_update(data.current_password, user.password)
+        if not valid:
             raise HTTPException(
                 detail="Contraseña incorrecta",
                 status_code=401,
             )
 
-        user.password = data.new_password
-        users_repo.update(user)
+        user.password = await password_pool.hash(data.new_password)
+        await users_repo.update(user)
+        await after_commit(principal_cache.invalidate)
 
     @delete("/{id:int}")
     async def delete_user(self, id: int, users_repo: UserRepository) -> None:
         """Delete a user by ID."""
-        users_repo.delete(id)
+        await users_repo.delete(id)
+        await after_commit(principal_cache.invalidate)
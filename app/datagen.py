@@ -0,0 +1,273 @@
+"""Synthetic library data at scale, written with COPY.
+
+Las distribuciones son sesgadas como en una biblioteca real: pocos libros
+concentran la mayoría de los préstamos y reseñas (ley de potencias), algunos
+usuarios tienen historiales muy largos y la mayoría muy cortos, y los préstamos
+mezclan devueltos (a tiempo o con multa), activos y vencidos. Todo sale de un
+``random.Random(seed)``, así que la misma escala y semilla generan los mismos datos.
+"""
+
+import itertools
+import random
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Callable, Iterator, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import LoanStatus
+from app.passwords import password_hasher
+from app.repositories.book import BookRepository
+from app.repositories.loan import FINE_PER_DAY
+
+LOAN_PERIOD = timedelta(days=14)
+HISTORY_DAYS = 5 * 365
+GENERATED_PASSWORD = "library"
+
+WORDS = (
+    "amor guerra noche ciudad río sombra tiempo mar viento fuego casa camino memoria silencio "
+    "jardín historia reino luz piedra invierno verano puerta espejo libro isla montaña bosque "
+    "hijo padre madre ciencia secreto viaje última primera perdida ciega eterna oscura"
+).split()
+FIRST_NAMES = "Ana Luis María José Carmen Jorge Sofía Pedro Lucía Diego Elena Pablo Isabel Tomás Valentina".split()
+LAST_NAMES = "González Muñoz Rojas Díaz Pérez Soto Contreras Silva Martínez Sepúlveda Morales Rodríguez".split()
+LANGUAGES = (("es", 70), ("en", 20), ("fr", 5), ("pt", 3), ("de", 2))
+# reseñas sesgadas hacia notas altas, como en la mayoría de los catálogos
+RATING_WEIGHTS = (4, 6, 15, 35, 40)
+
+# columnas de cada COPY, en el orden de las tuplas que generan los _<tabla>()
+CATEGORY_COLUMNS = ("id", "name", "description", "created_at", "updated_at")
+BOOK_COLUMNS = (
+    "id", "title", "author", "isbn", "pages", "published_year", "stock",
+    "description", "language", "publisher", "created_at", "updated_at",
+)
+USER_COLUMNS = (
+    "id", "username", "fullname", "password", "email", "phone", "address", "is_active", "created_at", "updated_at",
+)
+LOAN_COLUMNS = (
+    "id", "user_id", "book_id", "loan_dt", "due_date", "return_dt", "status", "fine_amount", "created_at", "updated_at",
+)
+REVIEW_COLUMNS = ("id", "user_id", "book_id", "rating", "comment", "review_date", "created_at", "updated_at")
+
+
+@dataclass(frozen=True)
+class DatasetSize:
+    """Row counts for a scale factor (scale 100 ≈ 10M loans)."""
+
+    categories: int
+    books: int
+    users: int
+    loans: int
+    reviews: int
+
+    @classmethod
+    def for_scale(cls, scale: float) -> "DatasetSize":
+        return cls(
+            categories=max(10, int(30 * scale**0.25)),
+            books=max(100, int(10_000 * scale)),
+            users=max(50, int(5_000 * scale)),
+            loans=max(1_000, int(100_000 * scale)),
+            reviews=max(200, int(20_000 * scale)),
+        )
+
+
+def _power_law_sampler(rng: random.Random, n: int, exponent: float) -> Callable[[int], list[int]]:
+    """Return ``sample(k)`` drawing k ids in 1..n with Zipf-like popularity.
+
+    El rango de popularidad se asigna a ids al azar para que los libros
+    populares no sean siempre los primeros ids.
+    """
+    ids = list(range(1, n + 1))
+    rng.shuffle(ids)
+    cum_weights = list(itertools.accumulate(1 / rank**exponent for rank in range(1, n + 1)))
+    return lambda k: rng.choices(ids, cum_weights=cum_weights, k=k)
+
+
+class DataGenerator:
+    """Streams generated rows into Postgres through COPY."""
+
+    def __init__(self, session: AsyncSession, scale: float, seed: int, batch_size: int = 50_000) -> None:
+        self.session = session
+        self.size = DatasetSize.for_scale(scale)
+        self.seed = seed
+        self.batch_size = batch_size
+        self.rng = random.Random(seed)
+        # medianoche de hoy: dos corridas del mismo día generan exactamente lo mismo
+        self.today = date.today()
+        self.now = datetime(self.today.year, self.today.month, self.today.day, tzinfo=timezone.utc)
+
+    async def is_empty(self) -> bool:
+        """Whether the library tables have no rows (the generator needs them empty)."""
+        for table in ("categories", "books", "users", "loans", "reviews"):
+            if await self.session.scalar(text(f"SELECT EXISTS (SELECT 1 FROM {table})")):
+                return False
+        return True
+
+    async def reset(self) -> None:
+        """Delete every row of the library tables and restart their ids."""
+        await self.session.execute(
+            text("TRUNCATE book_categories, reviews, loans, books, categories, users RESTART IDENTITY CASCADE")
+        )
+        await self.session.commit()
+
+    async def _copy(self, table: str, columns: Sequence[str], rows: Iterator[tuple[Any, ...]]) -> int:
+        connection = await self.session.connection()
+        raw_connection = await connection.get_raw_connection()
+        count = 0
+        async with raw_connection.driver_connection.cursor() as cursor:
+            async with cursor.copy(f"COPY {table} ({', '.join(columns)}) FROM STDIN") as copy:
+                for row in rows:
+                    await copy.write_row(row)
+                    count += 1
+        return count
+
+    async def run(self, progress: Callable[[str, int], None] = lambda table, rows: None) -> DatasetSize:
+        """Generate every table (which must be empty) and fix up sequences and aggregates."""
+        steps = (
+            ("categories", CATEGORY_COLUMNS, self._categories()),
+            ("books", BOOK_COLUMNS, self._books()),
+            ("book_categories", ("book_id", "category_id"), self._book_categories()),
+            ("users", USER_COLUMNS, self._users()),
+            ("loans", LOAN_COLUMNS, self._loans()),
+            ("reviews", REVIEW_COLUMNS, self._reviews()),
+        )
+        for table, columns, rows in steps:
+            progress(table, await self._copy(table, columns, rows))
+
+        for table in ("categories", "books", "users", "loans", "reviews"):
+            await self.session.execute(
+                text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))")
+            )
+        await self.session.commit()
+
+        # las reseñas se cargaron directo: recalcular review_count, rating_sum e histograma
+        await BookRepository(session=self.session).reconcile_review_stats()
+        for table in ("categories", "books", "book_categories", "users", "loans", "reviews"):
+            await self.session.execute(text(f"ANALYZE {table}"))
+        await self.session.commit()
+        return self.size
+
+    def _timestamp(self, day: date) -> datetime:
+        hour, minute = self.rng.randint(8, 20), self.rng.randint(0, 59)
+        return datetime(day.year, day.month, day.day, hour, minute, tzinfo=timezone.utc)
+
+    def _categories(self) -> Iterator[tuple[Any, ...]]:
+        for category_id in range(1, self.size.categories + 1):
+            name = f"{self.rng.choice(WORDS).capitalize()} {category_id}"
+            yield category_id, name, None, self.now, self.now
+
+    def _books(self) -> Iterator[tuple[Any, ...]]:
+        rng = self.rng
+        languages, language_weights = zip(*LANGUAGES)
+        n_authors = max(10, self.size.books // 8)
+        for book_id in range(1, self.size.books + 1):
+            title = " ".join(rng.sample(WORDS, rng.randint(2, 4))).capitalize()
+            created = self.now - timedelta(days=rng.randint(0, HISTORY_DAYS))
+            yield (
+                book_id,
+                # el id hace único el título
+                f"{title} {book_id}",
+                f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {rng.randint(1, n_authors)}",
+                f"ISBN-GEN-{book_id:09d}",
+                int(rng.lognormvariate(5.6, 0.45)) + 24,
+                min(self.today.year, int(rng.triangular(1850, self.today.year, 2015))),
+                rng.choice((1, 1, 2, 2, 3, 5)),
+                " ".join(rng.choices(WORDS, k=rng.randint(8, 30))) if rng.random() < 0.7 else None,
+                rng.choices(languages, language_weights)[0],
+                f"Editorial {rng.choice(LAST_NAMES)}" if rng.random() < 0.8 else None,
+                created,
+                created,
+            )
+
+    def _book_categories(self) -> Iterator[tuple[Any, ...]]:
+        # pocas categorías grandes y muchas chicas
+        sample_category = _power_law_sampler(self.rng, self.size.categories, exponent=0.8)
+        for book_id in range(1, self.size.books + 1):
+            for category_id in set(sample_category(self.rng.choice((1, 1, 2, 2, 3)))):
+                yield book_id, category_id
+
+    def _users(self) -> Iterator[tuple[Any, ...]]:
+        rng = self.rng
+        # un solo hash: Argon2 por fila tomaría horas a escala
+        hashed = password_hasher.hash(GENERATED_PASSWORD)
+        for user_id in range(1, self.size.users + 1):
+            created = self.now - timedelta(days=rng.randint(0, HISTORY_DAYS))
+            yield (
+                user_id,
+                f"user{user_id}",
+                f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {rng.choice(LAST_NAMES)}",
+                hashed,
+                f"user{user_id}@example.com" if rng.random() < 0.9 else None,
+                f"+569{rng.randint(10_000_000, 99_999_999)}" if rng.random() < 0.6 else None,
+                None,
+                rng.random() < 0.97,
+                created,
+                created,
+            )
+
+    def _loans(self) -> Iterator[tuple[Any, ...]]:
+        rng = self.rng
+        sample_book = _power_law_sampler(rng, self.size.books, exponent=1.1)
+        # pocos usuarios con historiales muy largos
+        sample_user = _power_law_sampler(rng, self.size.users, exponent=0.7)
+        loan_id = 0
+        remaining = self.size.loans
+        while remaining > 0:
+            batch = min(self.batch_size, remaining)
+            remaining -= batch
+            for user_id, book_id in zip(sample_user(batch), sample_book(batch)):
+                loan_id += 1
+                # más préstamos recientes que antiguos
+                loan_dt = self.today - timedelta(days=int(rng.triangular(0, HISTORY_DAYS, 0)))
+                due_date = loan_dt + LOAN_PERIOD
+                return_dt = None
+                fine_amount = None
+                if due_date >= self.today and rng.random() < 0.7:
+                    status = LoanStatus.ACTIVE
+                elif rng.random() < 0.93 or due_date >= self.today:
+                    status = LoanStatus.RETURNED
+                    return_dt = min(self.today, loan_dt + timedelta(days=int(rng.expovariate(1 / 10)) + 1))
+                    if return_dt > due_date:
+                        fine_amount = (return_dt - due_date).days * FINE_PER_DAY
+                else:
+                    # vencidos: la mayoría ya marcados por el barrido, algunos pendientes
+                    status = LoanStatus.OVERDUE if rng.random() < 0.8 else LoanStatus.ACTIVE
+                created = self._timestamp(loan_dt)
+                yield (
+                    loan_id,
+                    user_id,
+                    book_id,
+                    loan_dt,
+                    due_date,
+                    return_dt,
+                    status.value,
+                    Decimal(fine_amount).quantize(Decimal("0.01")) if fine_amount is not None else None,
+                    created,
+                    created,
+                )
+
+    def _reviews(self) -> Iterator[tuple[Any, ...]]:
+        rng = self.rng
+        sample_book = _power_law_sampler(rng, self.size.books, exponent=1.1)
+        sample_user = _power_law_sampler(rng, self.size.users, exponent=0.7)
+        review_id = 0
+        remaining = self.size.reviews
+        while remaining > 0:
+            batch = min(self.batch_size, remaining)
+            remaining -= batch
+            for user_id, book_id in zip(sample_user(batch), sample_book(batch)):
+                review_id += 1
+                review_date = self.today - timedelta(days=int(rng.triangular(0, HISTORY_DAYS, 0)))
+                created = self._timestamp(review_date)
+                yield (
+                    review_id,
+                    user_id,
+                    book_id,
+                    rng.choices((1, 2, 3, 4, 5), RATING_WEIGHTS)[0],
+                    " ".join(rng.choices(WORDS, k=rng.randint(3, 25))),
+                    review_date,
+                    created,
+                    created,
+                )
@@ -1,9 +1,288 @@
 """Database configuration with SQLAlchemy."""
 
-from advanced_alchemy.extensions.litestar import SQLAlchemyPlugin, SQLAlchemySyncConfig
+import asyncio
+import inspect
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, Callable
+
+from advanced_alchemy.extensions.litestar import (
+    AsyncSessionConfig,
+    EngineConfig,
+    SQLAlchemyAsyncConfig,
+    SQLAlchemyPlugin,
+    async_autocommit_handler_maker,
+    async_default_before_send_handler,
+)
+from litestar import Request
+from litestar.types import Message, Scope
+from sqlalchemy import Delete, Insert, Update, event, make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import ORMExecuteState, Session
+from sqlalchemy.pool import NullPool
 
 from app.config import settings
+from app.metrics import (
+    Gauge,
+    InstrumentedAsyncAdaptedQueuePool,
+    db_pool_connections_created,
+    install_sql_instrumentation,
+    registry,
+)
+
+_database_url = make_url(settings.database_url)
+_is_psycopg = _database_url.get_backend_name() == "postgresql" and _database_url.get_driver_name() == "psycopg"
+
+
+def _connect_args() -> dict:
+    # prepare_threshold es un parámetro de psycopg; otros drivers (sqlite en pruebas) no lo aceptan
+    return {"prepare_threshold": settings.db_prepare_threshold} if _is_psycopg else {}
+
+
+def _create_psycopg_pool():
+    """Build the psycopg_pool used in ``db_pool_mode = "psycopg"`` (opened on startup)."""
+    from psycopg_pool import AsyncConnectionPool
+
+    return AsyncConnectionPool(
+        _database_url.set(drivername="postgresql").render_as_string(hide_password=False),
+        min_size=max(settings.db_pool_warmup, 1),
+        max_size=settings.db_pool_size + settings.db_max_overflow,
+        timeout=settings.db_pool_timeout,
+        max_lifetime=settings.db_pool_recycle if settings.db_pool_recycle > 0 else 365 * 24 * 3600,
+        check=AsyncConnectionPool.check_connection if settings.db_pool_pre_ping else None,
+        kwargs=_connect_args(),
+        # conn.close() de SQLAlchemy devuelve la conexión al pool en vez de cerrarla
+        close_returns=True,
+        open=False,
+    )
+
+
+def _queue_pool_options() -> dict:
+    return {
+        "poolclass": InstrumentedAsyncAdaptedQueuePool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+
+psycopg_pool = _create_psycopg_pool() if settings.db_pool_mode == "psycopg" else None
+
+
+async def _psycopg_connect():
+    # open() es idempotente: los comandos de la CLI no pasan por el startup de la app
+    await psycopg_pool.open()
+    return await psycopg_pool.getconn()
+
+
+if psycopg_pool is not None:
+    # SQLAlchemy no guarda conexiones: cada checkout pide una a psycopg_pool
+    _engine_config = EngineConfig(poolclass=NullPool)
+    _create_engine = partial(create_async_engine, async_creator=_psycopg_connect)
+elif settings.db_pool_mode == "null":
+    _engine_config = EngineConfig(poolclass=NullPool, connect_args=_connect_args())
+    _create_engine = create_async_engine
+else:
+    _engine_config = EngineConfig(**_queue_pool_options(), connect_args=_connect_args())
+    _create_engine = create_async_engine
+
+# réplica de lectura opcional; en modo psycopg usa el pool de SQLAlchemy (psycopg_pool es solo del primario)
+replica_engine = (
+    create_async_engine(
+        settings.database_replica_url,
+        **({"poolclass": NullPool} if settings.db_pool_mode == "null" else _queue_pool_options()),
+        connect_args=_connect_args(),
+    )
+    if settings.database_replica_url
+    else None
+)
+
+# lo activa ReadReplicaMiddleware en los GET que pueden leer de la réplica
+_read_from_replica: ContextVar[bool] = ContextVar("read_from_replica", default=False)
+
+
+def route_reads_to_replica(enabled: bool) -> Token[bool]:
+    """Send (or stop sending) the current request's reads to the replica."""
+    return _read_from_replica.set(enabled and replica_engine is not None)
+
+
+def reset_read_routing(token: Token[bool]) -> None:
+    """Undo a ``route_reads_to_replica`` call."""
+    _read_from_replica.reset(token)
+
+
+class RoutingSession(Session):
+    """Session that sends reads to the replica when the request allows it.
+
+    Los flush y los INSERT/UPDATE/DELETE explícitos siempre van al primario.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if (
+            _read_from_replica.get()
+            and not self._flushing
+            and not isinstance(clause, (Insert, Update, Delete))
+        ):
+            return replica_engine.sync_engine
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+@dataclass
+class UnitOfWork:
+    """State of the request's transaction: whether it wrote and what to run after its commit."""
+
+    writes: bool = False
+    after_commit: list[Callable[[], Any]] = field(default_factory=list)
+
+
+# la unidad de trabajo del request en curso; None fuera de un request (CLI, scripts)
+_unit_of_work: ContextVar[UnitOfWork | None] = ContextVar("unit_of_work", default=None)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _flushed(session: Session, flush_context: Any) -> None:
+    if (unit_of_work := _unit_of_work.get()) is not None:
+        unit_of_work.writes = True
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _executed(state: ORMExecuteState) -> None:
+    # los UPDATE/INSERT/DELETE explícitos de los repositorios no pasan por flush
+    if (state.is_insert or state.is_update or state.is_delete) and (unit_of_work := _unit_of_work.get()) is not None:
+        unit_of_work.writes = True
+
+
+async def begin_unit_of_work(_: Request) -> None:
+    """Start the request's unit of work (app ``before_request`` hook)."""
+    _unit_of_work.set(UnitOfWork())
+
+
+async def after_commit(callback: Callable[..., Any], *args: Any) -> None:
+    """Run ``callback(*args)`` once the request's transaction commits, e.g. to invalidate a cache.
+
+    Fuera de un request corre enseguida. Si el request termina con error se
+    descarta junto con la transacción.
+    """
+    unit_of_work = _unit_of_work.get()
+    if unit_of_work is None:
+        await _run(partial(callback, *args))
+    else:
+        unit_of_work.after_commit.append(partial(callback, *args))
+
+
+async def _run(callback: Callable[[], Any]) -> None:
+    result = callback()
+    if inspect.isawaitable(result):
+        await result
+
+
+_commit_or_rollback = async_autocommit_handler_maker(commit_on_redirect=True)
+
+
+async def unit_of_work_handler(message: Message, scope: Scope) -> None:
+    """Commit the request's session once, when the response starts; error responses roll back.
+
+    Los repositorios solo hacen flush. Un request que no escribió (todos los GET,
+    un login sin rehash) solo cierra su sesión, sin COMMIT. Después del commit
+    corren los callbacks de ``after_commit``.
+    """
+    unit_of_work = _unit_of_work.get()
+    if unit_of_work is None or not unit_of_work.writes:
+        await async_default_before_send_handler(message, scope)
+    else:
+        await _commit_or_rollback(message, scope)
+
+    if unit_of_work is not None and message["type"] == "http.response.start":
+        _unit_of_work.set(None)
+        # mismo criterio que _commit_or_rollback: 2xx y 3xx hacen commit
+        if message["status"] < 400:
+            for callback in unit_of_work.after_commit:
+                await _run(callback)
+
+
+# expire_on_commit=False: en modo async no se pueden cargar atributos expirados de forma perezosa
+sqlalchemy_config = SQLAlchemyAsyncConfig(
+    connection_string=settings.database_url,
+    session_config=AsyncSessionConfig(expire_on_commit=False, sync_session_class=RoutingSession),
+    before_send_handler=unit_of_work_handler,
+    engine_config=_engine_config,
+    create_engine_callable=_create_engine,
+)
+
+
+@dataclass
+class PoolStats:
+    """Snapshot of the connection pool."""
+
+    mode: str
+    size: int
+    checked_out: int
+    waiting: int
+    created: int
+
+
+def pool_stats() -> PoolStats:
+    """Return the current connection pool counters."""
+    if psycopg_pool is not None:
+        stats = psycopg_pool.get_stats()
+        return PoolStats(
+            mode="psycopg",
+            size=stats.get("pool_size", 0),
+            checked_out=stats.get("pool_size", 0) - stats.get("pool_available", 0),
+            waiting=stats.get("requests_waiting", 0),
+            created=stats.get("connections_num", 0),
+        )
+
+    pool = sqlalchemy_config.get_engine().pool
+    created = int(db_pool_connections_created.total())
+    if isinstance(pool, InstrumentedAsyncAdaptedQueuePool):
+        return PoolStats(
+            mode="queue",
+            size=pool.checkedin() + pool.checkedout(),
+            checked_out=pool.checkedout(),
+            waiting=pool.waiting,
+            created=created,
+        )
+    return PoolStats(mode=settings.db_pool_mode, size=0, checked_out=0, waiting=0, created=created)
+
+
+async def open_pool() -> None:
+    """Open the connection pool and warm up ``db_pool_warmup`` connections (app startup)."""
+    if psycopg_pool is not None:
+        # abre min_size conexiones y espera a que estén listas
+        await psycopg_pool.open(wait=True, timeout=settings.db_pool_timeout)
+        return
+    if settings.db_pool_mode != "queue" or settings.db_pool_warmup <= 0:
+        return
+
+    engine = sqlalchemy_config.get_engine()
+    warmup = min(settings.db_pool_warmup, settings.db_pool_size)
+    connections = await asyncio.gather(*(engine.connect() for _ in range(warmup)))
+    # al cerrarlas vuelven al pool ya abiertas
+    await asyncio.gather(*(connection.close() for connection in connections))
+
+
+async def close_pool() -> None:
+    """Close the psycopg pool and the replica engine, if any (app shutdown)."""
+    if psycopg_pool is not None:
+        await psycopg_pool.close()
+    if replica_engine is not None:
+        await replica_engine.dispose()
+
 
-sqlalchemy_config = SQLAlchemySyncConfig(connection_string=settings.database_url)
+# conteo de queries por request, tiempo en SQL y eventos del pool para /metrics
+install_sql_instrumentation(sqlalchemy_config.get_engine())
+if replica_engine is not None:
+    install_sql_instrumentation(replica_engine)
+registry.register(Gauge("db_pool_size", "Open connections held by the pool.", lambda: pool_stats().size))
+registry.register(
+    Gauge("db_pool_checked_out", "Connections currently checked out of the pool.", lambda: pool_stats().checked_out)
+)
+registry.register(
+    Gauge("db_pool_waiting", "Checkouts currently waiting for a connection.", lambda: pool_stats().waiting)
+)
 
 sqlalchemy_plugin = SQLAlchemyPlugin(config=sqlalchemy_config)
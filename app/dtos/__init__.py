@@ -1 +1,29 @@
 """Data Transfer Objects for API requests and responses."""
+
+from dataclasses import replace
+from typing import Any
+
+from litestar.pagination import CursorPagination
+
+
+def _loaded_columns(instance: Any) -> dict[str, Any]:
+    # lo cargado de una instancia ORM está en su __dict__ (más _sa_instance_state, que el DTO ignora)
+    return instance.__dict__
+
+
+class LoadedColumnsMixin:
+    """Serializes only the columns that were actually loaded (``load_only``).
+
+    El DTO (parcial) recibe cada instancia como un mapping de sus columnas
+    cargadas: las que quedaron fuera del SELECT se omiten de la respuesta en vez
+    de dispararse una carga perezosa, que en async falla.
+    """
+
+    def data_to_encodable_type(self, data: Any) -> Any:
+        if isinstance(data, CursorPagination):
+            data = replace(data, items=[_loaded_columns(item) for item in data.items])
+        elif isinstance(data, (list, tuple)):
+            data = [_loaded_columns(item) for item in data]
+        else:
+            data = _loaded_columns(data)
+        return super().data_to_encodable_type(data)  # type: ignore[misc]
@@ -2,20 +2,67 @@
 
 from advanced_alchemy.extensions.litestar import SQLAlchemyDTO, SQLAlchemyDTOConfig
 
+from app.dtos import LoadedColumnsMixin
 from app.models import Book
 
+# campos calculados o mantenidos por la base de datos; nunca vienen del cliente
+BOOK_AGGREGATE_FIELDS = {
+    "loan_count",
+    "review_count",
+    "rating_sum",
+    "rating_1_count",
+    "rating_2_count",
+    "rating_3_count",
+    "rating_4_count",
+    "rating_5_count",
+    "average_rating",
+}
+
 
 class BookReadDTO(SQLAlchemyDTO[Book]):
-    """DTO for reading book data."""
+    """DTO for reading book data with its categories, loan count and review aggregates."""
+
+    # debe coincidir con BOOK_READ_PROFILE en app/repositories/book.py
+    config = SQLAlchemyDTOConfig(
+        exclude={"loans", "reviews"},
+    )
+
+
+# columnas de BookSummaryDTO que se pueden pedir con ?fields=
+BOOK_FIELDSET = (
+    "id",
+    "title",
+    "author",
+    "isbn",
+    "pages",
+    "published_year",
+    "stock",
+    "description",
+    "language",
+    "publisher",
+    "review_count",
+    "rating_sum",
+    "rating_1_count",
+    "rating_2_count",
+    "rating_3_count",
+    "rating_4_count",
+    "rating_5_count",
+)
+# columnas de los listados cuando no se pide ?fields=
+BOOK_SUMMARY_FIELDS = ("id", "title", "author", "isbn", "published_year", "language", "stock")
+
+
+class BookSummaryDTO(LoadedColumnsMixin, SQLAlchemyDTO[Book]):
+    """DTO for book listings: only the columns that were loaded (see BOOK_FIELDSET)."""
 
-    config = SQLAlchemyDTOConfig()
+    config = SQLAlchemyDTOConfig(include=set(BOOK_FIELDSET), partial=True)
 
 
 class BookCreateDTO(SQLAlchemyDTO[Book]):
     """DTO for creating books."""
 
     config = SQLAlchemyDTOConfig(
-        exclude={"id", "created_at", "updated_at", "loans", "reviews", "categories"},
+        exclude={"id", "created_at", "updated_at", "loans", "reviews", "categories", *BOOK_AGGREGATE_FIELDS},
     )
 
 
@@ -23,6 +70,6 @@ class BookUpdateDTO(SQLAlchemyDTO[Book]):
     """DTO for updating books with partial data."""
 
     config = SQLAlchemyDTOConfig(
-        exclude={"id", "created_at", "updated_at", "loans", "reviews", "categories"},
+        exclude={"id", "created_at", "updated_at", "loans", "reviews", "categories", *BOOK_AGGREGATE_FIELDS},
         partial=True,
     )
@@ -2,13 +2,35 @@
 
 from advanced_alchemy.extensions.litestar import SQLAlchemyDTO, SQLAlchemyDTOConfig
 
+from app.dtos import LoadedColumnsMixin
 from app.models import Loan
 
 
 class LoanReadDTO(SQLAlchemyDTO[Loan]):
-    """DTO for reading loan data."""
+    """DTO for reading loan data with its user and book."""
 
-    config = SQLAlchemyDTOConfig()
+    # debe coincidir con LOAN_READ_PROFILE en app/repositories/loan.py; de los conteos
+    # solo faltan los que son query_expression (los agregados de reseñas de Book son columnas)
+    config = SQLAlchemyDTOConfig(
+        exclude={
+            "user.password",
+            "user.loan_count",
+            "user.review_count",
+            "book.loan_count",
+        },
+    )
+
+
+# columnas de LoanSummaryDTO que se pueden pedir con ?fields=
+LOAN_FIELDSET = ("id", "user_id", "book_id", "loan_dt", "due_date", "return_dt", "status", "fine_amount")
+# columnas de los listados cuando no se pide ?fields=: sin el usuario ni el libro anidados
+LOAN_SUMMARY_FIELDS = LOAN_FIELDSET
+
+
+class LoanSummaryDTO(LoadedColumnsMixin, SQLAlchemyDTO[Loan]):
+    """DTO for loan listings: ids instead of the nested user and book, only the loaded columns."""
+
+    config = SQLAlchemyDTOConfig(include=set(LOAN_FIELDSET), partial=True)
 
 
 class LoanCreateDTO(SQLAlchemyDTO[Loan]):
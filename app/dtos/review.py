@@ -8,8 +8,17 @@ from app.models import Review
 class ReviewReadDTO(SQLAlchemyDTO[Review]):
     """DTO for reading review data, including user and book relations."""
 
+    # debe coincidir con REVIEW_READ_PROFILE en app/repositories/review.py; de los conteos
+    # solo faltan los que son query_expression (los agregados de reseñas de Book son columnas)
     config = SQLAlchemyDTOConfig(
-        exclude={"created_at", "updated_at"},
+        exclude={
+            "created_at",
+            "updated_at",
+            "user.password",
+            "user.loan_count",
+            "user.review_count",
+            "book.loan_count",
+        },
     )
 
 
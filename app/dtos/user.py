@@ -6,16 +6,17 @@ from app.models import User
 
 
 class UserReadDTO(SQLAlchemyDTO[User]):
-    """DTO for reading user data without password."""
+    """DTO for reading user data without password, with loan/review counts."""
 
-    config = SQLAlchemyDTOConfig(exclude={"admin"})
+    # debe coincidir con USER_READ_PROFILE en app/repositories/user.py
+    config = SQLAlchemyDTOConfig(exclude={"password", "loans", "reviews"})
 
 
 class UserCreateDTO(SQLAlchemyDTO[User]):
     """DTO for creating users."""
 
     config = SQLAlchemyDTOConfig(
-        exclude={"id", "created_at", "updated_at", "loans", "reviews", "is_active"},
+        exclude={"id", "created_at", "updated_at", "loans", "reviews", "is_active", "loan_count", "review_count"},
     )
 
 
@@ -23,7 +24,7 @@ class UserUpdateDTO(SQLAlchemyDTO[User]):
     """DTO for updating users with partial data."""
 
     config = SQLAlchemyDTOConfig(
-        exclude={"id", "created_at", "password", "loans", "reviews", "is_active"},
+        exclude={"id", "created_at", "password", "loans", "reviews", "is_active", "loan_count", "review_count"},
         partial=True,
     )
 
@@ -0,0 +1,257 @@
+"""Low-overhead request, SQL, pool and Argon2 metrics in Prometheus text format.
+
+Las métricas son por proceso: con varios workers cada uno expone las suyas y
+Prometheus las suma por instancia.
+"""
+
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable
+
+from litestar.types import ASGIApp, Message, Receive, Scope, Send
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+Labels = tuple[str, ...]
+
+
+def _format_labels(names: tuple[str, ...], values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter, optionally split by labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1, labels: Labels = ()) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def total(self) -> float:
+        return sum(self._values.values())
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram, optionally split by labels."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # por etiqueta: [conteo por bucket..., +Inf], suma
+        self._values: dict[Labels, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        entry = self._values.get(labels)
+        if entry is None:
+            entry = self._values[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1][0] += value
+
+    def samples(self) -> Iterable[str]:
+        for labels, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total[0]}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}"
+
+
+class Gauge:
+    """Value read from a callback when /metrics is scraped.
+
+    Con ``kind="counter"`` expone contadores que ya lleva otro objeto (por
+    ejemplo los hits de una caché) sin duplicarlos.
+    """
+
+    def __init__(self, name: str, help: str, read: Callable[[], float | None], kind: str = "gauge") -> None:
+        self.name = name
+        self.help = help
+        self.read = read
+        self.kind = kind
+
+    def samples(self) -> Iterable[str]:
+        value = self.read()
+        if value is not None:
+            yield f"{self.name} {value}"
+
+
+class MetricsRegistry:
+    """Holds the metrics and renders them in the Prometheus text format."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Counter | Histogram | Gauge] = {}
+
+    def register(self, metric: Any) -> Any:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_request_duration = registry.register(
+    Histogram("http_request_duration_seconds", "Request latency by route handler.", ("method", "route", "status"))
+)
+http_request_queries = registry.register(
+    Histogram("http_request_db_queries", "SQL statements executed per request.", ("method", "route"), buckets=COUNT_BUCKETS)
+)
+http_request_db_time = registry.register(
+    Histogram("http_request_db_seconds", "Time spent in SQL per request.", ("method", "route"))
+)
+http_request_commits = registry.register(
+    Histogram("http_request_db_commits", "Transactions committed per request.", ("method", "route"), buckets=COUNT_BUCKETS)
+)
+db_queries = registry.register(Counter("db_queries_total", "SQL statements executed."))
+db_commits = registry.register(Counter("db_commits_total", "Transactions committed."))
+db_query_duration = registry.register(Histogram("db_query_duration_seconds", "Duration of each SQL statement."))
+db_pool_checkouts = registry.register(Counter("db_pool_checkouts_total", "Connections checked out of the pool."))
+db_pool_connections_created = registry.register(
+    Counter("db_pool_connections_created_total", "New database connections opened by the pool.")
+)
+db_pool_wait = registry.register(
+    Histogram("db_pool_wait_seconds", "Time spent waiting for a pooled connection.")
+)
+password_hash_duration = registry.register(
+    Histogram("password_hash_duration_seconds", "Argon2 hash/verify time in the worker pool.", ("operation",))
+)
+password_hash_wait = registry.register(
+    Histogram("password_hash_wait_seconds", "Time Argon2 operations waited for a free worker.", ("operation",))
+)
+
+
+@dataclass
+class RequestStats:
+    """SQL counters of the request being served."""
+
+    queries: int = 0
+    db_time: float = 0.0
+    commits: int = 0
+
+
+_request_stats: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+def install_sql_instrumentation(engine: AsyncEngine) -> None:
+    """Hook SQL and pool events of ``engine`` into the metrics."""
+    sync_engine = engine.sync_engine
+
+    # el inicio va en el contexto de ejecución de la sentencia y no en la conexión: si la
+    # sentencia falla no hay after_cursor_execute y el contexto se descarta con ella
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        if context is not None:
+            context._query_start = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        start = getattr(context, "_query_start", None)
+        elapsed = time.perf_counter() - start if start is not None else 0.0
+        db_queries.inc()
+        db_query_duration.observe(elapsed)
+        # el contextvar del request llega hasta acá a través del greenlet de SQLAlchemy
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_time += elapsed
+
+    @event.listens_for(sync_engine, "commit")
+    def _commit(conn) -> None:
+        db_commits.inc()
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.commits += 1
+
+    @event.listens_for(sync_engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy) -> None:
+        db_pool_checkouts.inc()
+
+    @event.listens_for(sync_engine, "connect")
+    def _connect(dbapi_connection, connection_record) -> None:
+        db_pool_connections_created.inc()
+
+
+class InstrumentedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """Default async queue pool that also measures how long checkouts wait."""
+
+    # checkouts esperando una conexión en este momento
+    waiting = 0
+
+    def _do_get(self) -> Any:
+        start = time.perf_counter()
+        self.waiting += 1
+        try:
+            return super()._do_get()
+        finally:
+            self.waiting -= 1
+            db_pool_wait.observe(time.perf_counter() - start)
+
+
+class MetricsMiddleware:
+    """Times every request, counts its SQL and adds a ``Server-Timing`` header."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                total_ms = (time.perf_counter() - start) * 1000
+                timing = (
+                    f'db;dur={stats.db_time * 1000:.2f};desc="{stats.queries} queries", app;dur={total_ms:.2f}'
+                ).encode()
+                message["headers"] = [*message.get("headers", []), (b"server-timing", timing)]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_stats.reset(token)
+            method = scope["method"]
+            route = scope.get("path_template") or "unmatched"
+            http_request_duration.observe(time.perf_counter() - start, (method, route, str(status)))
+            http_request_queries.observe(stats.queries, (method, route))
+            http_request_commits.observe(stats.commits, (method, route))
+            http_request_db_time.observe(stats.db_time, (method, route))
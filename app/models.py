@@ -1,13 +1,17 @@
 """Database models for the library management system."""
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import date, datetime
 from decimal import Decimal
 from enum import Enum
+from typing import Generic, TypeVar
 
 from advanced_alchemy.base import BigIntAuditBase
-from sqlalchemy import ForeignKey, Column, Table, Enum as SAEnum, Numeric
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from litestar.dto import dto_field
+from sqlalchemy import Computed, ForeignKey, Column, Index, Table, Enum as SAEnum, Numeric, cast, func, literal_column, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import Mapped, mapped_column, query_expression, relationship
 
 
 # Tabla intermedia para la relación many-to-many entre books y categories
@@ -16,12 +20,15 @@ book_categories = Table(
     BigIntAuditBase.metadata,
     Column("book_id", ForeignKey("books.id"), primary_key=True),
     Column("category_id", ForeignKey("categories.id"), primary_key=True),
+    # la PK (book_id, category_id) no sirve para buscar por categoría
+    Index("ix_book_categories_category_id", "category_id"),
 )
 
 class User(BigIntAuditBase):
     """User model with audit fields."""
 
     __tablename__ = "users"
+    __table_args__ = (Index("ix_users_created_at_id", "created_at", "id"),)
 
     username: Mapped[str] = mapped_column(unique=True)
     fullname: Mapped[str]
@@ -36,11 +43,25 @@ class User(BigIntAuditBase):
 
     reviews: Mapped[list["Review"]] = relationship(back_populates="user")
 
+    # conteos que calcula el perfil de carga del repositorio (None si no se pidieron)
+    loan_count: Mapped[int | None] = query_expression()
+    review_count: Mapped[int | None] = query_expression()
+
     
 class Book(BigIntAuditBase):
     """Book model with audit fields."""
 
     __tablename__ = "books"
+    __table_args__ = (
+        Index("ix_books_created_at_id", "created_at", "id"),
+        Index("ix_books_search_vector", "search_vector", postgresql_using="gin"),
+        # pg_trgm: búsquedas con errores de tipeo e ILIKE '%...%' indexados
+        Index("ix_books_title_trgm", "title", postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}),
+        Index("ix_books_author_trgm", "author", postgresql_using="gin", postgresql_ops={"author": "gin_trgm_ops"}),
+        # "más reseñados" y "mejor valorados" se leen directo del índice
+        Index("ix_books_review_count_id", "review_count", "id"),
+        Index("ix_books_average_rating_id", text("(CAST(rating_sum AS NUMERIC) / NULLIF(review_count, 0))"), "id"),
+    )
 
     title: Mapped[str] = mapped_column(unique=True)
     author: Mapped[str]
@@ -53,6 +74,20 @@ class Book(BigIntAuditBase):
     language: Mapped[str]
     publisher: Mapped[str | None] = mapped_column(nullable=True)
 
+    # columna generada por Postgres para la búsqueda full-text; nunca se serializa
+    search_vector: Mapped[str | None] = mapped_column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(author, '')), 'B') || "
+            "setweight(to_tsvector('simple', coalesce(publisher, '')), 'C') || "
+            "setweight(to_tsvector('simple', coalesce(description, '')), 'D')",
+            persisted=True,
+        ),
+        deferred=True,
+        info=dto_field("private"),
+    )
+
     loans: Mapped[list["Loan"]] = relationship(back_populates="book")
 
     categories: Mapped[list["Category"]] = relationship(
@@ -62,6 +97,33 @@ class Book(BigIntAuditBase):
 
     reviews: Mapped[list["Review"]] = relationship(back_populates="book")
 
+    loan_count: Mapped[int | None] = query_expression()
+
+    # agregados de reseñas que mantiene ReviewRepository en la misma transacción
+    # (se pueden recalcular con `litestar library reconcile-review-stats`)
+    review_count: Mapped[int] = mapped_column(default=0, server_default=text("0"))
+    rating_sum: Mapped[int] = mapped_column(default=0, server_default=text("0"))
+    rating_1_count: Mapped[int] = mapped_column(default=0, server_default=text("0"))
+    rating_2_count: Mapped[int] = mapped_column(default=0, server_default=text("0"))
+    rating_3_count: Mapped[int] = mapped_column(default=0, server_default=text("0"))
+    rating_4_count: Mapped[int] = mapped_column(default=0, server_default=text("0"))
+    rating_5_count: Mapped[int] = mapped_column(default=0, server_default=text("0"))
+
+    @hybrid_property
+    def average_rating(self) -> float | None:
+        """Mean rating, or None when the book has no reviews."""
+        if not self.review_count:
+            return None
+        return self.rating_sum / self.review_count
+
+    @average_rating.inplace.expression
+    @classmethod
+    def _average_rating_expression(cls):
+        # misma expresión que ix_books_average_rating_id
+        # op("/") en vez de "/" para que SQLAlchemy no agregue otro CAST y coincida con el índice
+        divide = cast(cls.rating_sum, Numeric).op("/", return_type=Numeric)
+        return divide(func.nullif(cls.review_count, literal_column("0")))
+
 class LoanStatus(str, Enum):
     """Loan status enum."""
 
@@ -73,6 +135,17 @@ class Loan(BigIntAuditBase):
     """Loan model with audit fields."""
 
     __tablename__ = "loans"
+    __table_args__ = (
+        Index("ix_loans_created_at_id", "created_at", "id"),
+        # historial de un usuario paginado por (loan_dt, id)
+        Index("ix_loans_user_id_loan_dt_id", "user_id", "loan_dt", "id"),
+        # barrido de vencidos: solo los préstamos ACTIVE
+        Index("ix_loans_due_date_active", "due_date", postgresql_where=text("status = 'ACTIVE'")),
+        # activos y vencidos (ambas ramas del OR de get_overdue_loans)
+        Index("ix_loans_status_due_date", "status", "due_date"),
+        Index("ix_loans_book_id", "book_id"),
+        Index("ix_loans_loan_dt", "loan_dt"),
+    )
 
     loan_dt: Mapped[date] = mapped_column(default=datetime.today)
     return_dt: Mapped[date | None] = mapped_column(nullable=True)
@@ -95,6 +168,7 @@ class Category(BigIntAuditBase):
     """Category model for grouping books."""
 
     __tablename__ = "categories"
+    __table_args__ = (Index("ix_categories_created_at_id", "created_at", "id"),)
 
     name: Mapped[str] = mapped_column(unique=True)
     description: Mapped[str | None] = mapped_column(nullable=True)
@@ -108,6 +182,11 @@ class Review(BigIntAuditBase):
     """Review model with audit fields."""
 
     __tablename__ = "reviews"
+    __table_args__ = (
+        Index("ix_reviews_created_at_id", "created_at", "id"),
+        Index("ix_reviews_book_id", "book_id"),
+        Index("ix_reviews_user_id", "user_id"),
+    )
 
     rating: Mapped[int]
     comment: Mapped[str]
@@ -137,3 +216,44 @@ class BookStats:
     average_pages: float
     oldest_publication_year: int | None
     newest_publication_year: int | None
+    books_by_language: dict[str, int] = field(default_factory=dict)
+    books_by_category: dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class BulkCheckout:
+    """Bulk checkout request: one user takes several books."""
+
+    user_id: int
+    book_ids: list[int]
+    loan_dt: date | None = None
+    # True: si algún libro falla no se presta ninguno
+    atomic: bool = True
+
+
+@dataclass
+class BulkReturn:
+    """Bulk return request."""
+
+    loan_ids: list[int]
+    # True: si algún préstamo falla no se devuelve ninguno
+    atomic: bool = True
+
+
+@dataclass
+class BulkItemError:
+    """An item of a bulk operation that could not be processed (a book_id or a loan_id)."""
+
+    id: int
+    detail: str
+
+
+T = TypeVar("T")
+
+
+@dataclass
+class BulkLoanResult(Generic[T]):
+    """Loans created or returned by a bulk operation, plus the items that failed."""
+
+    loans: list[T]
+    errors: list[BulkItemError] = field(default_factory=list)
@@ -0,0 +1,56 @@
+"""MessagePack content negotiation for internal API consumers.
+
+Con ``Accept: application/msgpack`` las respuestas JSON salen como MessagePack
+(mismo contenido, mismo encoder msgspec de Litestar) y los cuerpos de POST/PATCH
+pueden enviarse con ``Content-Type: application/msgpack``. Sin esos headers
+todo sigue siendo JSON.
+"""
+
+from typing import Any
+
+from litestar import Request, Response
+from litestar.enums import MediaType
+from litestar.serialization import encode_msgpack
+from litestar.utils.helpers import get_enum_string_value
+
+# variantes en uso del tipo de MessagePack; Litestar solo conoce application/x-msgpack
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+
+class NegotiatedRequest(Request):
+    """Request that reads MessagePack bodies wherever a JSON body is expected."""
+
+    @property
+    def content_type(self) -> tuple[str, dict[str, str]]:
+        media_type, options = super().content_type
+        # los DTO decodifican MessagePack solo si ven el tipo que conoce Litestar
+        if media_type in MSGPACK_MEDIA_TYPES:
+            return MediaType.MESSAGEPACK.value, options
+        return media_type, options
+
+    async def json(self) -> Any:
+        if self.content_type[0] == MediaType.MESSAGEPACK:
+            return await self.msgpack()
+        return await super().json()
+
+
+class NegotiatedResponse(Response):
+    """Response that switches JSON content to MessagePack when the client prefers it."""
+
+    def render(self, content: Any, media_type: str, enc_hook: Any = None) -> bytes:
+        if media_type in MSGPACK_MEDIA_TYPES and not isinstance(content, bytes):
+            return encode_msgpack(content, enc_hook)
+        return super().render(content, media_type, enc_hook)
+
+    def to_asgi_response(
+        self, app: Any, request: Request, *, media_type: MediaType | str | None = None, **kwargs: Any
+    ) -> Any:
+        resolved = get_enum_string_value(self.media_type or media_type or MediaType.JSON)
+        if resolved == MediaType.JSON:
+            # */* o un Accept sin MessagePack siguen recibiendo JSON
+            self.media_type = request.accept.best_match(
+                [MediaType.JSON.value, *MSGPACK_MEDIA_TYPES], default=MediaType.JSON.value
+            )
+            # la misma URL cambia de representación según Accept
+            self.headers.setdefault("Vary", "Accept")
+        return super().to_asgi_response(app, request, media_type=media_type, **kwargs)
@@ -0,0 +1,129 @@
+"""Argon2 password hashing outside the event loop."""
+
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Literal
+
+from pwdlib import PasswordHash
+
+from app.config import settings
+from app.metrics import Gauge, password_hash_duration, password_hash_wait, registry
+
+password_hasher = PasswordHash.recommended()
+
+
+# funciones de módulo para que el ProcessPoolExecutor pueda serializarlas
+def _hash(password: str) -> str:
+    return password_hasher.hash(password)
+
+
+def _verify_and_update(password: str, hashed: str) -> tuple[bool, str | None]:
+    return password_hasher.verify_and_update(password, hashed)
+
+
+@dataclass
+class PasswordPoolStats:
+    """Snapshot of the password pool counters."""
+
+    max_workers: int
+    in_flight: int
+    waiting: int
+    completed: int
+
+
+class PasswordHashPool:
+    """Runs Argon2 hashing and verification in a bounded thread or process pool.
+
+    At most ``max_workers`` operations run at once; the rest wait on a
+    semaphore and show up as ``waiting`` in ``stats()``.
+    """
+
+    def __init__(self, kind: Literal["thread", "process"], max_workers: int) -> None:
+        self.kind = kind
+        self.max_workers = max_workers
+        self._executor: Executor | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        self._in_flight = 0
+        self._waiting = 0
+        self._completed = 0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                # argon2-cffi libera el GIL, así que los threads sí corren en paralelo
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="argon2",
+                )
+        return self._executor
+
+    async def _run(self, operation: str, fn, *args):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+
+        self._waiting += 1
+        queued_at = time.perf_counter()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+
+        self._in_flight += 1
+        started_at = time.perf_counter()
+        password_hash_wait.observe(started_at - queued_at, (operation,))
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            password_hash_duration.observe(time.perf_counter() - started_at, (operation,))
+            self._in_flight -= 1
+            self._completed += 1
+            self._semaphore.release()
+
+    async def hash(self, password: str) -> str:
+        """Hash a password with the current Argon2 parameters."""
+        return await self._run("hash", _hash, password)
+
+    async def verify_and_update(self, password: str, hashed: str) -> tuple[bool, str | None]:
+        """Verify a password.
+
+        The second value is a new hash when the stored one was made with
+        outdated parameters and should be replaced, otherwise None.
+        """
+        return await self._run("verify", _verify_and_update, password, hashed)
+
+    def stats(self) -> PasswordPoolStats:
+        """Return the current pool counters."""
+        return PasswordPoolStats(
+            max_workers=self.max_workers,
+            in_flight=self._in_flight,
+            waiting=self._waiting,
+            completed=self._completed,
+        )
+
+    def shutdown(self) -> None:
+        """Stop the worker pool (called on application shutdown)."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_pool = PasswordHashPool(
+    kind=settings.password_hash_executor,
+    max_workers=settings.password_hash_workers,
+)
+
+registry.register(
+    Gauge("password_hash_in_flight", "Argon2 operations running.", lambda: password_pool.stats().in_flight)
+)
+registry.register(
+    Gauge("password_hash_waiting", "Argon2 operations waiting for a worker.", lambda: password_pool.stats().waiting)
+)
@@ -0,0 +1,132 @@
+"""Routing of GET requests to the optional read replica.
+
+Un GET lee de la réplica solo si está sana y al día (``db_replica_max_lag``) y
+si el cliente no escribió hace poco: después de cualquier request que modifica
+datos se le deja una cookie que lo mantiene en el primario durante
+``db_replica_sticky_seconds``, así ve sus propias escrituras.
+"""
+
+import asyncio
+import logging
+import time
+from http.cookies import SimpleCookie
+
+from litestar.types import ASGIApp, Message, Receive, Scope, Send
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import settings
+from app.db import replica_engine, reset_read_routing, route_reads_to_replica
+from app.metrics import Gauge, registry
+
+logger = logging.getLogger(__name__)
+
+STICKY_COOKIE = "read_primary_until"
+SAFE_METHODS = frozenset({"GET", "HEAD"})
+
+# en un primario (o una base suelta, como en pruebas locales) el atraso es 0
+REPLICA_LAG_SQL = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE coalesce(extract(epoch FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+    """
+)
+
+
+class ReplicaMonitor:
+    """Polls the replica in the background and says whether reads may use it.
+
+    Hasta el primer chequeo exitoso la réplica se considera no disponible.
+    """
+
+    def __init__(self, engine: AsyncEngine | None, max_lag: float, interval: float) -> None:
+        self.engine = engine
+        self.max_lag = max_lag
+        self.interval = interval
+        self.lag: float | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def usable(self) -> bool:
+        return self.lag is not None and self.lag <= self.max_lag
+
+    async def check(self) -> None:
+        """Measure the replica lag; a failure marks the replica as unavailable."""
+        try:
+            async with self.engine.connect() as connection:
+                self.lag = float(await connection.scalar(REPLICA_LAG_SQL))
+        except Exception:
+            if self.lag is not None:
+                logger.warning("Read replica unavailable, reading from the primary", exc_info=True)
+            self.lag = None
+
+    async def _run(self) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(self.interval)
+
+    async def start(self) -> None:
+        """Start polling (app startup); does nothing without a replica."""
+        if self.engine is not None and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop polling (app shutdown)."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+replica_monitor = ReplicaMonitor(replica_engine, settings.db_replica_max_lag, settings.db_replica_check_interval)
+
+if replica_engine is not None:
+    registry.register(Gauge("db_replica_lag_seconds", "Replication lag of the read replica.", lambda: replica_monitor.lag))
+    registry.register(
+        Gauge("db_replica_usable", "Whether GET requests are being read from the replica.", lambda: int(replica_monitor.usable))
+    )
+
+
+def _sticky(scope: Scope) -> bool:
+    cookie_header = dict(scope["headers"]).get(b"cookie")
+    if cookie_header is None:
+        return False
+    morsel = SimpleCookie(cookie_header.decode("latin-1")).get(STICKY_COOKIE)
+    try:
+        return morsel is not None and float(morsel.value) > time.time()
+    except ValueError:
+        return False
+
+
+class ReadReplicaMiddleware:
+    """Sends safe requests to the replica and pins writers to the primary for a while."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or replica_engine is None:
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] in SAFE_METHODS:
+            token = route_reads_to_replica(replica_monitor.usable and not _sticky(scope))
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                reset_read_routing(token)
+            return
+
+        async def send_with_cookie(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                until = time.time() + settings.db_replica_sticky_seconds
+                cookie = (
+                    f"{STICKY_COOKIE}={until:.0f}; Max-Age={settings.db_replica_sticky_seconds:.0f}; "
+                    "Path=/; HttpOnly; SameSite=Lax"
+                )
+                message["headers"] = [*message.get("headers", []), (b"set-cookie", cookie.encode())]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
@@ -0,0 +1,60 @@
+"""Fetch many rows by id in one query (``GET /<recurso>/batch?ids=...``)."""
+
+from dataclasses import dataclass, field
+from typing import Annotated, Any, Generic, Sequence, TypeVar
+
+from litestar.exceptions import ValidationException
+from litestar.params import Parameter
+from sqlalchemy import BigInteger, ColumnElement, any_, bindparam
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from app.config import settings
+
+T = TypeVar("T")
+
+
+@dataclass
+class BatchResult(Generic[T]):
+    """Rows in the order their ids were requested, plus the ids that do not exist."""
+
+    items: list[T]
+    missing: list[int] = field(default_factory=list)
+
+
+async def provide_batch_ids(ids: Annotated[list[str], Parameter(query="ids")]) -> list[int]:
+    """Provide the requested ids from ``?ids=1,2,3`` (or ``?ids=1&ids=2``), without duplicates."""
+    try:
+        parsed = [int(value) for raw in ids for value in raw.split(",") if value.strip()]
+    except ValueError as exc:
+        raise ValidationException(detail="ids debe ser una lista de enteros separados por comas") from exc
+
+    unique = list(dict.fromkeys(parsed))
+    check_batch_size(unique)
+    return unique
+
+
+def check_batch_size(ids: Sequence[int]) -> None:
+    """Reject an empty batch or one larger than ``settings.batch_max_ids``."""
+    if not ids:
+        raise ValidationException(detail="Se necesita al menos un id")
+    if len(ids) > settings.batch_max_ids:
+        raise ValidationException(detail=f"Se pueden pedir hasta {settings.batch_max_ids} ids por llamada")
+
+
+def id_in(column: Any, ids: Sequence[int]) -> ColumnElement[bool]:
+    """``column = ANY(:ids)``."""
+    # = ANY(:ids) con un solo parámetro array: la misma sentencia preparada sirve para cualquier cantidad de ids
+    return column == any_(bindparam("batch_ids", list(ids), type_=ARRAY(BigInteger)))
+
+
+class BatchLookupMixin:
+    """Adds ``get_many`` to a repository."""
+
+    async def get_many(self, ids: Sequence[int]) -> BatchResult[Any]:
+        """Return the rows with ``ids`` in request order and the ids that were not found."""
+        rows = await self.list(id_in(self.model_type.id, ids))  # type: ignore[attr-defined]
+        by_id = {row.id: row for row in rows}
+        return BatchResult(
+            items=[by_id[row_id] for row_id in ids if row_id in by_id],
+            missing=[row_id for row_id in ids if row_id not in by_id],
+        )
@@ -1,61 +1,213 @@
 """Repository for Book database operations."""
 
-from typing import Sequence
+from typing import Annotated, Sequence
+from datetime import datetime, timezone
 
-from advanced_alchemy.repository import SQLAlchemySyncRepository
-from sqlalchemy import func, select
-from sqlalchemy.orm import Session
+from advanced_alchemy.repository import SQLAlchemyAsyncRepository
+from litestar.pagination import CursorPagination
+from litestar.params import Parameter
+from sqlalchemy import func, literal, null, or_, select, union_all, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload, with_expression
 
-from app.models import Book, Review
+from app.cache import SnapshotCache
+from app.config import settings
+from app.dtos.book import BOOK_FIELDSET, BOOK_SUMMARY_FIELDS
+from app.models import Book, BookStats, Category, Loan, Review, book_categories
+from app.repositories.fieldsets import fieldset_profile, parse_fieldset
+from app.repositories.batch import BatchLookupMixin
+from app.repositories.pagination import KeysetPaginationMixin, KeysetParams
 
+# perfil de carga de BookReadDTO: categorías en una sola consulta extra y el conteo
+# de préstamos en vez de la lista completa (las reseñas ya están agregadas en Book)
+BOOK_READ_PROFILE = [
+    selectinload(Book.categories),
+    with_expression(
+        Book.loan_count,
+        select(func.count(Loan.id)).where(Loan.book_id == Book.id).correlate(Book).scalar_subquery(),
+    ),
+]
 
-class BookRepository(SQLAlchemySyncRepository[Book]):
+# snapshot de /books/stats; lo invalidan las escrituras sobre libros y categorías
+book_stats_cache: SnapshotCache[BookStats] = SnapshotCache(ttl=settings.book_stats_cache_ttl)
+
+
+class BookRepository(KeysetPaginationMixin, BatchLookupMixin, SQLAlchemyAsyncRepository[Book]):
     """Repository for book database operations."""
 
     model_type = Book
+    # en async no se pueden cargar relaciones de forma perezosa: todo lo que
+    # serializa BookReadDTO tiene que venir en el perfil de carga
+    loader_options = BOOK_READ_PROFILE
 
-    def get_available_books(self) -> Sequence[Book]:
-        """Return books with stock > 0."""
-        return self.list(Book.stock > 0)
+    async def get_available_books(self, params: KeysetParams) -> CursorPagination[str, Book]:
+        """Return a page of books with stock > 0."""
+        return await self.paginate(Book.stock > 0, params=params)
 
-    def find_by_category(self, category_id: int) -> Sequence[Book]:
-        """Return books that belong to a given category."""
-        return self.list(Book.categories.any(id=category_id))
+    async def find_by_category(self, category_id: int, params: KeysetParams) -> CursorPagination[str, Book]:
+        """Return a page of books that belong to a given category."""
+        return await self.paginate(Book.categories.any(id=category_id), params=params)
 
-    def get_most_reviewed_books(self, limit: int = 10) -> Sequence[Book]:
+    async def get_most_reviewed_books(self, limit: int = 10) -> Sequence[Book]:
         """Return books ordered by number of reviews (desc)."""
+        stmt = select(Book).order_by(Book.review_count.desc(), Book.id.desc()).limit(limit)
+        return await self.list(statement=stmt)
+
+    async def get_top_rated_books(self, limit: int = 10, min_reviews: int = 1) -> Sequence[Book]:
+        """Return books with at least ``min_reviews`` reviews ordered by average rating (desc)."""
         stmt = (
             select(Book)
+            .where(Book.review_count >= min_reviews)
+            .order_by(Book.average_rating.desc(), Book.id.desc())
+            .limit(limit)
+        )
+        return await self.list(statement=stmt)
+
+    async def reconcile_review_stats(self) -> list[int]:
+        """Recompute the review aggregates of every book from ``reviews``.
+
+        Solo se escriben los libros cuyos agregados no coinciden; devuelve sus ids.
+        """
+        stats = (
+            select(
+                Book.id.label("book_id"),
+                func.count(Review.id).label("review_count"),
+                func.coalesce(func.sum(Review.rating), 0).label("rating_sum"),
+                *(
+                    func.count(Review.id).filter(Review.rating == rating).label(f"rating_{rating}_count")
+                    for rating in range(1, 6)
+                ),
+            )
             .outerjoin(Review, Review.book_id == Book.id)
             .group_by(Book.id)
-            .order_by(func.count(Review.id).desc())
-            .limit(limit)
+            .subquery()
+        )
+        columns = [column.name for column in stats.c if column.name != "book_id"]
+        book_ids = await self.session.scalars(
+            update(Book)
+            .where(
+                Book.id == stats.c.book_id,
+                or_(*(getattr(Book, name) != stats.c[name] for name in columns)),
+            )
+            .values({name: stats.c[name] for name in columns})
+            .returning(Book.id)
+            .execution_options(synchronize_session=False)
         )
-        return list(self.session.scalars(stmt).all())
+        book_ids = list(book_ids)
+        return book_ids
 
-    def update_stock(self, book_id: int, quantity: int) -> Book:
+    async def update_stock(self, book_id: int, quantity: int) -> Book:
         """Update stock of a given book.
 
         quantity puede ser positivo (sumar stock) o negativo (restar stock).
         Lanza ValueError si el stock resultante quedaría negativo.
+        Se hace en un solo UPDATE condicional, así no se pierden actualizaciones concurrentes.
         """
-        book = self.get(book_id)
-        new_stock = (book.stock or 0) + quantity
-        if new_stock < 0:
+        new_stock = await self.session.scalar(
+            update(Book)
+            .where(Book.id == book_id, Book.stock + quantity >= 0)
+            .values(stock=Book.stock + quantity, updated_at=datetime.now(timezone.utc))
+            .returning(Book.stock)
+        )
+        if new_stock is None:
+            # lanza NotFoundError si el libro no existe
+            await self.get(book_id)
             raise ValueError("El stock no puede quedar negativo.")
 
-        book.stock = new_stock
-        self.session.add(book)
-        self.session.commit()
-        self.session.refresh(book)
-        return book
+        return await self.get(book_id)
+
+    async def get_stats(self) -> BookStats:
+        """Compute catalog statistics in the database with a single statement."""
+        # un solo round trip: las filas por idioma y por categoría en un UNION ALL,
+        # distinguidas por ``kind``; los totales se derivan de las filas por idioma
+        by_language = select(
+            literal("language").label("kind"),
+            Book.language.label("name"),
+            func.count(Book.id).label("books"),
+            func.sum(Book.pages).label("pages"),
+            func.min(Book.published_year).label("oldest"),
+            func.max(Book.published_year).label("newest"),
+        ).group_by(Book.language)
+        by_category = (
+            select(literal("category"), Category.name, func.count(book_categories.c.book_id), null(), null(), null())
+            .outerjoin(book_categories, book_categories.c.category_id == Category.id)
+            .group_by(Category.id, Category.name)
+        )
+        rows = (await self.session.execute(union_all(by_language, by_category))).all()
+
+        languages = [row for row in rows if row.kind == "language"]
+        books_by_category = {row.name: row.books for row in rows if row.kind == "category"}
+        total_books = sum(row.books for row in languages)
+        if total_books == 0:
+            return BookStats(
+                total_books=0,
+                average_pages=0,
+                oldest_publication_year=None,
+                newest_publication_year=None,
+                books_by_category=books_by_category,
+            )
+
+        return BookStats(
+            total_books=total_books,
+            average_pages=sum(row.pages for row in languages) / total_books,
+            oldest_publication_year=min(row.oldest for row in languages),
+            newest_publication_year=max(row.newest for row in languages),
+            books_by_language={row.name: row.books for row in languages},
+            books_by_category=books_by_category,
+        )
+
+    async def search(self, query: str, limit: int = 20) -> Sequence[Book]:
+        """Full-text search over title, author, publisher and description.
+
+        Also matches titles and authors with typos (pg_trgm word similarity).
+        Results are ordered by relevance, best first.
+        """
+        ts_query = func.websearch_to_tsquery("simple", query)
+        rank = (
+            func.ts_rank_cd(Book.search_vector, ts_query)
+            + func.word_similarity(query, Book.title)
+            + func.word_similarity(query, Book.author)
+        )
+        stmt = (
+            select(Book)
+            .where(
+                or_(
+                    Book.search_vector.op("@@")(ts_query),
+                    Book.title.op("%>")(query),
+                    Book.author.op("%>")(query),
+                )
+            )
+            .order_by(rank.desc(), Book.id)
+            .limit(limit)
+        )
+        return await self.list(statement=stmt)
+
+    async def search_by_author(self, author_name: str, limit: int = 20) -> Sequence[Book]:
+        """Search books by author name using ILIKE (partial search, trigram-indexed).
+
+        Results are ordered by word similarity to the author name, best first.
+        """
+        stmt = (
+            select(Book)
+            .where(Book.author.ilike(f"%{author_name}%"))
+            .order_by(func.word_similarity(author_name, Book.author).desc(), Book.id)
+            .limit(limit)
+        )
+        return await self.list(statement=stmt)
+
 
-    def search_by_author(self, author_name: str) -> Sequence[Book]:
-        """Search books by author name using ILIKE (partial search)."""
-        pattern = f"%{author_name}%"
-        return self.list(Book.author.ilike(pattern))
+async def provide_book_repo(db_session: AsyncSession) -> BookRepository:
+    """Provide book repository instance; it only flushes, the request commits once at the end."""
+    # sin auto_refresh: refresh() expira las relaciones precargadas y en async no se pueden recargar
+    return BookRepository(session=db_session, auto_commit=False, auto_refresh=False)
 
 
-async def provide_book_repo(db_session: Session) -> BookRepository:
-    """Provide book repository instance with auto-commit."""
-    return BookRepository(session=db_session, auto_commit=True)
+async def provide_book_summary_repo(
+    db_session: AsyncSession,
+    fields: Annotated[str | None, Parameter(query="fields", required=False)] = None,
+) -> BookRepository:
+    """Provide a book repository for listings that SELECTs only the ``?fields=`` columns (BookSummaryDTO)."""
+    columns = parse_fieldset(fields, allowed=BOOK_FIELDSET, default=BOOK_SUMMARY_FIELDS)
+    # las columnas del cursor se cargan siempre para poder armar la página siguiente
+    load = fieldset_profile(Book, columns, always=BookRepository.keyset_columns)
+    return BookRepository(session=db_session, load=load, auto_commit=False, auto_refresh=False)
@@ -1,17 +1,18 @@
 """Repository for Category database operations."""
 
-from advanced_alchemy.repository import SQLAlchemySyncRepository
-from sqlalchemy.orm import Session
+from advanced_alchemy.repository import SQLAlchemyAsyncRepository
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models import Category
+from app.repositories.pagination import KeysetPaginationMixin
 
 
-class CategoryRepository(SQLAlchemySyncRepository[Category]):
+class CategoryRepository(KeysetPaginationMixin, SQLAlchemyAsyncRepository[Category]):
     """Repository for category database operations."""
 
     model_type = Category
 
 
-async def provide_category_repo(db_session: Session) -> CategoryRepository:
-    """Provide category repository instance with auto-commit."""
-    return CategoryRepository(session=db_session, auto_commit=True)
+async def provide_category_repo(db_session: AsyncSession) -> CategoryRepository:
+    """Provide category repository instance; it only flushes, the request commits once at the end."""
+    return CategoryRepository(session=db_session, auto_commit=False, auto_refresh=False)
@@ -0,0 +1,34 @@
+"""Sparse fieldsets (``?fields=``) for the collection endpoints."""
+
+from typing import Any, Iterable, Sequence
+
+from sqlalchemy.orm import load_only
+from sqlalchemy.orm.strategy_options import _AbstractLoad
+
+
+class InvalidFieldsError(ValueError):
+    """Raised when ``?fields=`` names a field that cannot be selected."""
+
+
+def parse_fieldset(raw: str | None, allowed: Iterable[str], default: Sequence[str]) -> tuple[str, ...]:
+    """Parse a comma separated ``?fields=`` value; without one the ``default`` fields are used.
+
+    ``id`` siempre se incluye.
+    """
+    if raw is None or not raw.strip():
+        return tuple(default)
+
+    fields = [name.strip() for name in raw.split(",") if name.strip()]
+    unknown = sorted(set(fields) - set(allowed))
+    if unknown:
+        raise InvalidFieldsError(f"Campos desconocidos: {', '.join(unknown)} (disponibles: {', '.join(sorted(allowed))})")
+    return tuple(dict.fromkeys(["id", *fields]))
+
+
+def fieldset_profile(model: Any, fields: Sequence[str], always: Sequence[str] = ()) -> list[_AbstractLoad]:
+    """Loader options that SELECT only ``fields`` (plus ``always``, e.g. the pagination cursor columns).
+
+    Las columnas de ``always`` que expone el DTO también aparecen en la respuesta.
+    """
+    columns = dict.fromkeys([*fields, *always])
+    return [load_only(*(getattr(model, name) for name in columns), raiseload=True)]
@@ -1,49 +1,85 @@
 """Repository for Loan database operations."""
 
-from typing import Sequence
-from datetime import date
+from collections import Counter
+from typing import Annotated, Mapping, Sequence
+from datetime import date, datetime, timezone
 from decimal import Decimal
 
-from advanced_alchemy.repository import SQLAlchemySyncRepository
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from advanced_alchemy.exceptions import NotFoundError
+from advanced_alchemy.repository import SQLAlchemyAsyncRepository
+from litestar.pagination import CursorPagination
+from litestar.params import Parameter
+from sqlalchemy import ColumnElement, Date, Row, case, func, insert, literal, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
-from app.models import Loan, LoanStatus
+from app.config import settings
+from app.dtos.loan import LOAN_FIELDSET, LOAN_SUMMARY_FIELDS
+from app.models import Book, BulkItemError, BulkLoanResult, Loan, LoanStatus, User
+from app.repositories.fieldsets import fieldset_profile, parse_fieldset
+from app.repositories.batch import BatchLookupMixin, id_in
+from app.repositories.pagination import KeysetPaginationMixin, KeysetParams
 
+# multa por día de atraso (configurable con FINE_PER_DAY)
+FINE_PER_DAY = settings.fine_per_day
 
-class LoanRepository(SQLAlchemySyncRepository[Loan]):
+# perfil de carga de LoanReadDTO: user y book son many-to-one, van en el mismo SELECT
+LOAN_READ_PROFILE = [joinedload(Loan.user), joinedload(Loan.book)]
+# columnas de los cursores de paginación (listado e historial por usuario)
+LOAN_CURSOR_COLUMNS = ("created_at", "id", "loan_dt")
+# columnas que se copian de cada Loan en checkout_many (el resto tiene default)
+BULK_CHECKOUT_COLUMNS = ("user_id", "book_id", "loan_dt", "due_date", "status", "fine_amount")
+
+
+class BulkLoanError(ValueError):
+    """Raised when an all-or-nothing bulk operation has items that cannot be processed."""
+
+    def __init__(self, errors: list[BulkItemError]) -> None:
+        super().__init__("No se procesó ningún ítem: hay ítems con errores")
+        self.errors = errors
+
+
+class LoanRepository(KeysetPaginationMixin, BatchLookupMixin, SQLAlchemyAsyncRepository[Loan]):
     """Repository for loan database operations."""
 
     model_type = Loan
+    loader_options = LOAN_READ_PROFILE
 
     # préstamos activos
-    def get_active_loans(self) -> Sequence[Loan]:
+    async def get_active_loans(self) -> Sequence[Loan]:
         """Return loans with status ACTIVE."""
-        return self.list(Loan.status == LoanStatus.ACTIVE)
+        return await self.list(Loan.status == LoanStatus.ACTIVE)
 
-    # préstamos vencidos, marcar como overdue
-    def get_overdue_loans(self) -> Sequence[Loan]:
-        """Return loans that are overdue and mark them as OVERDUE."""
-        today = date.today()
-        stmt = select(Loan).where(
-            Loan.status == LoanStatus.ACTIVE,
-            Loan.due_date < today,
+    # préstamos vencidos (solo lectura)
+    async def get_overdue_loans(self) -> Sequence[Loan]:
+        """Return overdue loans, including ACTIVE ones the sweep has not marked yet."""
+        return await self.list(
+            or_(
+                Loan.status == LoanStatus.OVERDUE,
+                (Loan.status == LoanStatus.ACTIVE) & (Loan.due_date < date.today()),
+            )
         )
-        loans = list(self.session.scalars(stmt).all())
-
-        if not loans:
-            return loans
 
-        for loan in loans:
-            loan.status = LoanStatus.OVERDUE
-            self.session.add(loan)
+    # marcar vencidos en un solo UPDATE
+    async def mark_overdue_loans(self, today: date | None = None) -> list[int]:
+        """Mark ACTIVE loans past their due date as OVERDUE.
 
-        self.session.commit()
-
-        for loan in loans:
-            self.session.refresh(loan)
-
-        return loans
+        Runs as a single UPDATE ... RETURNING and is idempotent.
+        Returns the ids of the loans that changed.
+        """
+        stmt = (
+            update(Loan)
+            .where(
+                Loan.status == LoanStatus.ACTIVE,
+                Loan.due_date < (today or date.today()),
+            )
+            # un UPDATE masivo no pasa por el listener que mantiene updated_at
+            .values(status=LoanStatus.OVERDUE, updated_at=datetime.now(timezone.utc))
+            .returning(Loan.id)
+            .execution_options(synchronize_session=False)
+        )
+        loan_ids = list((await self.session.scalars(stmt)).all())
+        return loan_ids
 
     # helper para no repetir lógica de multa
     def _calculate_fine_for_loan(self, loan: Loan) -> Decimal:
@@ -54,62 +90,271 @@ class LoanRepository(SQLAlchemySyncRepository[Loan]):
             return Decimal("0.00")
 
         days_late = (ref_date - loan.due_date).days
-        return Decimal("500") * days_late
+        return FINE_PER_DAY * days_late
+
+    # días de atraso como expresión SQL
+    @staticmethod
+    def _days_late_expression(ref_date: date | ColumnElement[date]) -> ColumnElement[int]:
+        """SQL expression for the days a loan returned on ``ref_date`` is late (0 if on time)."""
+        if isinstance(ref_date, date):
+            ref_date = literal(ref_date, Date)
+        return func.greatest(ref_date - Loan.due_date, 0)
+
+    # misma regla de multa, como expresión SQL
+    @classmethod
+    def _fine_expression(cls, ref_date: date | ColumnElement[date]) -> ColumnElement[Decimal]:
+        """SQL expression for the fine of a loan returned on ``ref_date``."""
+        return cls._days_late_expression(ref_date) * FINE_PER_DAY
+
+    # préstamos abiertos se cuentan hasta hoy, los devueltos hasta su return_dt
+    @staticmethod
+    def _fine_reference_date() -> ColumnElement[date]:
+        return func.coalesce(Loan.return_dt, func.current_date())
+
+    # multas de un usuario en una sola query
+    async def get_user_fines(self, user_id: int, status: LoanStatus | None = None) -> Sequence[Row]:
+        """Return the user's loans that carry a fine, with days late and amount.
+
+        Filas con loan_id, book_id, status, due_date, return_dt, days_late y fine.
+        """
+        ref_date = self._fine_reference_date()
+        stmt = (
+            select(
+                Loan.id.label("loan_id"),
+                Loan.book_id,
+                Loan.status,
+                Loan.due_date,
+                Loan.return_dt,
+                self._days_late_expression(ref_date).label("days_late"),
+                self._fine_expression(ref_date).label("fine"),
+            )
+            .where(Loan.user_id == user_id, ref_date > Loan.due_date)
+            .order_by(Loan.due_date, Loan.id)
+        )
+        if status is not None:
+            stmt = stmt.where(Loan.status == status)
+        return (await self.session.execute(stmt)).all()
+
+    # totales de multas de toda la biblioteca en una sola query
+    async def get_fine_totals(self, status: LoanStatus | None = None) -> Sequence[Row]:
+        """Return, per loan status, how many loans carry a fine and their total amount."""
+        ref_date = self._fine_reference_date()
+        stmt = (
+            select(
+                Loan.status,
+                func.count().label("loans"),
+                func.sum(self._fine_expression(ref_date)).label("total"),
+            )
+            .where(ref_date > Loan.due_date)
+            .group_by(Loan.status)
+            .order_by(Loan.status)
+        )
+        if status is not None:
+            stmt = stmt.where(Loan.status == status)
+        return (await self.session.execute(stmt)).all()
 
     # calcular multa de un préstamo
-    def calculate_fine(self, loan_id: int) -> Decimal:
-        """Calculate fine for a loan: $500 per day of delay."""
-        loan = self.get(loan_id)
+    async def calculate_fine(self, loan_id: int) -> Decimal:
+        """Calculate fine for a loan: FINE_PER_DAY per day of delay."""
+        loan = await self.get(loan_id)
         return self._calculate_fine_for_loan(loan)
 
     # procesar devolución y actualizar stock
-    def return_book(self, loan_id: int) -> Loan:
+    async def return_book(self, loan_id: int) -> Loan:
         """Process book return.
 
         - status → RETURNED
         - return_dt → hoy
         - fine_amount calculado y guardado (si corresponde)
         - incrementa stock del libro asociado
+
+        Ambos cambios son UPDATE condicionales en la misma transacción, así dos
+        devoluciones simultáneas del mismo préstamo no suman stock dos veces.
+        """
+        today = date.today()
+        now = datetime.now(timezone.utc)
+
+        book_id = await self.session.scalar(
+            update(Loan)
+            .where(Loan.id == loan_id, Loan.status != LoanStatus.RETURNED)
+            .values(
+                status=LoanStatus.RETURNED,
+                return_dt=today,
+                # sin atraso queda en NULL
+                fine_amount=func.nullif(self._fine_expression(today), 0),
+                updated_at=now,
+            )
+            .returning(Loan.book_id)
+        )
+
+        # si ya estaba devuelto no hay nada que hacer (get lanza NotFoundError si no existe)
+        if book_id is not None:
+            await self.session.execute(
+                update(Book)
+                .where(Book.id == book_id)
+                .values(stock=Book.stock + 1, updated_at=now)
+            )
+
+        return await self.get(loan_id)
+
+    # crear préstamo y descontar stock en la misma transacción
+    async def checkout(self, loan: Loan) -> Loan:
+        """Create a loan and take one copy of its book out of stock.
+
+        Lanza ValueError si el libro no tiene stock disponible.
         """
-        loan = self.get(loan_id)
+        taken = await self.session.scalar(
+            update(Book)
+            .where(Book.id == loan.book_id, Book.stock > 0)
+            .values(stock=Book.stock - 1, updated_at=datetime.now(timezone.utc))
+            .returning(Book.id)
+        )
+        if taken is None:
+            if await self.session.scalar(select(Book.id).where(Book.id == loan.book_id)) is None:
+                raise NotFoundError(f"No book found with id {loan.book_id}")
+            raise ValueError("El libro no tiene stock disponible.")
+
+        loan = await self.add(loan, auto_commit=False)
+        return await self.get(loan.id)
 
-        # si ya está devuelto, retorna
-        if loan.status == LoanStatus.RETURNED:
-            return loan
+    # devolver varios préstamos con una cantidad fija de queries
+    async def return_books(self, loan_ids: Sequence[int], atomic: bool = True) -> BulkLoanResult[Loan]:
+        """Return several loans in one transaction.
 
-        # fecha de devolución = hoy
-        loan.return_dt = date.today()
+        Un UPDATE ... RETURNING marca todos los préstamos y otro UPDATE suma el
+        stock agrupado por libro, sin importar cuántos préstamos vengan.
+        Con ``atomic`` cualquier préstamo inexistente o ya devuelto lanza
+        BulkLoanError y el request deshace la transacción; si no, se devuelven
+        los demás y el error va por ítem.
+        """
+        loan_ids = list(dict.fromkeys(loan_ids))
+        today = date.today()
+        now = datetime.now(timezone.utc)
 
-        # calcular multa en base a return_dt y due_date
-        fine = self._calculate_fine_for_loan(loan)
-        loan.fine_amount = fine if fine > 0 else None
+        returned = (
+            await self.session.execute(
+                update(Loan)
+                .where(id_in(Loan.id, loan_ids), Loan.status != LoanStatus.RETURNED)
+                .values(
+                    status=LoanStatus.RETURNED,
+                    return_dt=today,
+                    fine_amount=func.nullif(self._fine_expression(today), 0),
+                    updated_at=now,
+                )
+                .returning(Loan.id, Loan.book_id)
+                .execution_options(synchronize_session=False)
+            )
+        ).all()
 
-        loan.status = LoanStatus.RETURNED
+        returned_ids = {row.id for row in returned}
+        failed = [loan_id for loan_id in loan_ids if loan_id not in returned_ids]
+        errors = []
+        if failed:
+            existing = set(await self.session.scalars(select(Loan.id).where(id_in(Loan.id, failed))))
+            errors = [
+                BulkItemError(
+                    loan_id, "El préstamo ya fue devuelto." if loan_id in existing else "Préstamo no encontrado."
+                )
+                for loan_id in failed
+            ]
+            if atomic:
+                raise BulkLoanError(errors)
 
-        # incrementar stock del libro
-        if loan.book is not None:
-            if loan.book.stock is None:
-                loan.book.stock = 0
-            loan.book.stock += 1
-            self.session.add(loan.book)
+        if returned:
+            # un libro con varios préstamos devueltos suma todas sus copias de una vez
+            await self._add_stock(Counter(row.book_id for row in returned), now)
 
-        self.session.add(loan)
-        self.session.commit()
-        self.session.refresh(loan)
+        batch = await self.get_many([loan_id for loan_id in loan_ids if loan_id in returned_ids])
+        return BulkLoanResult(loans=batch.items, errors=errors)
 
-        return loan
+    # crear varios préstamos con una cantidad fija de queries
+    async def checkout_many(self, loans: Sequence[Loan], atomic: bool = True) -> BulkLoanResult[Loan]:
+        """Create several loans of one user and take their books out of stock in one transaction.
 
-    # historial de préstamos de un usuario
-    def get_user_loan_history(self, user_id: int) -> Sequence[Loan]:
-        """Return a user's full loan history ordered by loan date (newest first)."""
+        El stock se descuenta con un solo UPDATE condicional agrupado por libro y
+        los préstamos se insertan juntos. Un libro pedido más de una vez se presta
+        solo si alcanzan las copias para todas. Con ``atomic`` cualquier libro sin
+        stock o inexistente lanza BulkLoanError y el request deshace la transacción
+        (incluido el stock ya descontado); si no, se prestan los demás.
+        Los préstamos vuelven ordenados por id.
+        """
+        user_ids = {loan.user_id for loan in loans}
+        existing_users = set(await self.session.scalars(select(User.id).where(id_in(User.id, user_ids))))
+        if missing_users := user_ids - existing_users:
+            raise NotFoundError(f"No user found with id {min(missing_users)}")
+
+        wanted = Counter(loan.book_id for loan in loans)
+        now = datetime.now(timezone.utc)
+        taken = set(await self._add_stock({book_id: -count for book_id, count in wanted.items()}, now))
+
+        failed = [book_id for book_id in wanted if book_id not in taken]
+        errors = []
+        if failed:
+            existing = set(await self.session.scalars(select(Book.id).where(id_in(Book.id, failed))))
+            errors = [
+                BulkItemError(
+                    book_id, "El libro no tiene stock disponible." if book_id in existing else "Libro no encontrado."
+                )
+                for book_id in failed
+            ]
+            if atomic:
+                raise BulkLoanError(errors)
+
+        rows = [
+            {column: getattr(loan, column) for column in BULK_CHECKOUT_COLUMNS}
+            for loan in loans
+            if loan.book_id in taken
+        ]
+        loan_ids: list[int] = []
+        if rows:
+            # un solo INSERT ... VALUES (...), (...) RETURNING id para todos los préstamos
+            loan_ids = sorted(await self.session.scalars(insert(Loan).values(rows).returning(Loan.id)))
+
+        batch = await self.get_many(loan_ids)
+        return BulkLoanResult(loans=batch.items, errors=errors)
+
+    # sumar (o restar) stock a varios libros en un solo UPDATE
+    async def _add_stock(self, copies: Mapping[int, int], now: datetime) -> Sequence[int]:
+        """Add ``copies[book_id]`` to the stock of each book; negative counts take copies out.
+
+        Al descontar, un libro sin copias suficientes no cambia. Devuelve los ids actualizados.
+        """
+        copies = {book_id: count for book_id, count in copies.items() if count}
+        if not copies:
+            return []
+        delta = case(copies, value=Book.id)
         stmt = (
-            select(Loan)
-            .where(Loan.user_id == user_id)
-            .order_by(Loan.loan_dt.desc())
+            update(Book)
+            .where(id_in(Book.id, copies))
+            .values(stock=Book.stock + delta, updated_at=now)
+            .returning(Book.id)
+            .execution_options(synchronize_session=False)
+        )
+        if any(count < 0 for count in copies.values()):
+            stmt = stmt.where(Book.stock + delta >= 0)
+        return (await self.session.scalars(stmt)).all()
+
+    # historial de préstamos de un usuario
+    async def get_user_loan_history(self, user_id: int, params: KeysetParams) -> CursorPagination[str, Loan]:
+        """Return a page of a user's loan history ordered by loan date (newest first)."""
+        return await self.paginate(
+            Loan.user_id == user_id,
+            params=params,
+            columns=[Loan.loan_dt, Loan.id],
+            descending=True,
         )
-        return list(self.session.scalars(stmt).all())
 
 
-async def provide_loan_repo(db_session: Session) -> LoanRepository:
-    """Provide loan repository instance with auto-commit."""
-    return LoanRepository(session=db_session, auto_commit=True)
+async def provide_loan_repo(db_session: AsyncSession) -> LoanRepository:
+    """Provide loan repository instance; it only flushes, the request commits once at the end."""
+    return LoanRepository(session=db_session, auto_commit=False, auto_refresh=False)
+
+
+async def provide_loan_summary_repo(
+    db_session: AsyncSession,
+    fields: Annotated[str | None, Parameter(query="fields", required=False)] = None,
+) -> LoanRepository:
+    """Provide a loan repository for listings that SELECTs only the ``?fields=`` columns (LoanSummaryDTO)."""
+    columns = parse_fieldset(fields, allowed=LOAN_FIELDSET, default=LOAN_SUMMARY_FIELDS)
+    load = fieldset_profile(Loan, columns, always=LOAN_CURSOR_COLUMNS)
+    return LoanRepository(session=db_session, load=load, auto_commit=False, auto_refresh=False)
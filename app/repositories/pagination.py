@@ -0,0 +1,106 @@
+"""Keyset (cursor) pagination shared by the repositories."""
+
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Annotated, Any, Sequence
+
+from advanced_alchemy.filters import StatementFilter
+from litestar.pagination import CursorPagination
+from litestar.params import Parameter
+from sqlalchemy import ColumnElement, Select, select, tuple_
+from sqlalchemy.orm import InstrumentedAttribute
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+@dataclass
+class KeysetParams:
+    """Cursor pagination query parameters."""
+
+    after: str | None
+    limit: int
+
+
+async def provide_keyset_params(
+    after: Annotated[str | None, Parameter(query="after", required=False)] = None,
+    limit: Annotated[int, Parameter(query="limit", ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+) -> KeysetParams:
+    """Provide cursor pagination parameters from the query string."""
+    return KeysetParams(after=after, limit=limit)
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode the sort key of the last row of a page as an opaque cursor."""
+    raw = [value.isoformat() if isinstance(value, (date, datetime)) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(raw).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: Sequence[InstrumentedAttribute[Any]]) -> tuple[Any, ...]:
+    """Decode a cursor back into sort key values typed like ``columns``."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(raw, list) or len(raw) != len(columns):
+            raise InvalidCursorError("Cursor inválido")
+
+        values = []
+        for column, value in zip(columns, raw):
+            python_type = column.type.python_type
+            if python_type is datetime:
+                value = datetime.fromisoformat(value)
+            elif python_type is date:
+                value = date.fromisoformat(value)
+            elif not isinstance(value, python_type):
+                raise InvalidCursorError("Cursor inválido")
+            values.append(value)
+        return tuple(values)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as exc:
+        raise InvalidCursorError("Cursor inválido") from exc
+
+
+class KeysetPaginationMixin:
+    """Adds ``paginate`` to a repository.
+
+    Rows are ordered by ``keyset_columns`` (``(created_at, id)`` by default) and
+    the next page starts strictly after the last row of the previous one, so
+    every page is a single index range scan regardless of its depth.
+    """
+
+    keyset_columns: tuple[str, ...] = ("created_at", "id")
+
+    async def paginate(
+        self,
+        *filters: StatementFilter | ColumnElement[bool],
+        params: KeysetParams,
+        columns: Sequence[InstrumentedAttribute[Any]] | None = None,
+        descending: bool = False,
+        statement: Select[Any] | None = None,
+    ) -> CursorPagination[str, Any]:
+        """Return one page of rows plus the cursor of the next one."""
+        if columns is None:
+            columns = [getattr(self.model_type, name) for name in self.keyset_columns]  # type: ignore[attr-defined]
+
+        stmt = statement if statement is not None else select(self.model_type)  # type: ignore[attr-defined]
+        if params.after is not None:
+            key = tuple_(*columns)
+            after = tuple_(*decode_cursor(params.after, columns))
+            stmt = stmt.where(key < after if descending else key > after)
+
+        stmt = stmt.order_by(*(column.desc() if descending else column.asc() for column in columns))
+        # una fila extra para saber si existe una página siguiente
+        rows = list(await self.list(*filters, statement=stmt.limit(params.limit + 1)))  # type: ignore[attr-defined]
+
+        cursor = None
+        if len(rows) > params.limit:
+            rows = rows[: params.limit]
+            cursor = encode_cursor([getattr(rows[-1], column.key) for column in columns])
+
+        return CursorPagination(items=rows, results_per_page=params.limit, cursor=cursor)
@@ -1,17 +1,88 @@
 """Repository for Review database operations."""
 
-from advanced_alchemy.repository import SQLAlchemySyncRepository
-from sqlalchemy.orm import Session
+from typing import Any
 
-from app.models import Review
+from advanced_alchemy.repository import SQLAlchemyAsyncRepository
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
+from app.models import Book, Review
+from app.repositories.pagination import KeysetPaginationMixin
 
-class ReviewRepository(SQLAlchemySyncRepository[Review]):
+# perfil de carga de ReviewReadDTO: user y book en el mismo SELECT
+REVIEW_READ_PROFILE = [joinedload(Review.user), joinedload(Review.book)]
+
+# columna del histograma de Book para cada rating
+RATING_HISTOGRAM = {
+    1: Book.rating_1_count,
+    2: Book.rating_2_count,
+    3: Book.rating_3_count,
+    4: Book.rating_4_count,
+    5: Book.rating_5_count,
+}
+
+
+class ReviewRepository(KeysetPaginationMixin, SQLAlchemyAsyncRepository[Review]):
     """Repository for review database operations."""
 
     model_type = Review
+    loader_options = REVIEW_READ_PROFILE
+
+    async def _apply_rating(self, book_id: int, rating: int, sign: int) -> None:
+        """Add (sign=1) or remove (sign=-1) one rating from the book aggregates."""
+        histogram = RATING_HISTOGRAM[rating]
+        await self.session.execute(
+            update(Book)
+            .where(Book.id == book_id)
+            .values(
+                {
+                    Book.review_count: Book.review_count + sign,
+                    Book.rating_sum: Book.rating_sum + sign * rating,
+                    histogram: histogram + sign,
+                }
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    async def add_review(self, review: Review) -> Review:
+        """Insert a review and count it in the book aggregates in one transaction."""
+        review = await self.add(review, auto_commit=False)
+        await self._apply_rating(review.book_id, review.rating, 1)
+        return await self.get(review.id)
+
+    async def update_review(self, review_id: int, **changes: Any) -> Review:
+        """Update a review, moving its rating between books/buckets if it changed.
+
+        La fila se bloquea (FOR UPDATE) para que dos ediciones concurrentes no
+        descuenten el mismo rating viejo.
+        """
+        old = (
+            await self.session.execute(
+                select(Review.book_id, Review.rating).where(Review.id == review_id).with_for_update()
+            )
+        ).one_or_none()
+        # lanza NotFoundError si la reseña no existe
+        review = await self.get(review_id)
+        old_book_id, old_rating = old
+
+        for name, value in changes.items():
+            setattr(review, name, value)
+        await self.session.flush()
+
+        if (review.book_id, review.rating) != (old_book_id, old_rating):
+            await self._apply_rating(old_book_id, old_rating, -1)
+            await self._apply_rating(review.book_id, review.rating, 1)
+        # el libro quedó en la sesión con los agregados de antes del UPDATE: recargarlo
+        return await self.get(review_id, execution_options={"populate_existing": True})
+
+    async def delete_review(self, review_id: int) -> Review:
+        """Delete a review and remove it from the book aggregates in one transaction."""
+        review = await self.delete(review_id, auto_commit=False)
+        await self._apply_rating(review.book_id, review.rating, -1)
+        return review
 
 
-async def provide_review_repo(db_session: Session) -> ReviewRepository:
-    """Provide review repository instance with auto-commit."""
-    return ReviewRepository(session=db_session, auto_commit=True)
+async def provide_review_repo(db_session: AsyncSession) -> ReviewRepository:
+    """Provide review repository instance; it only flushes, the request commits once at the end."""
+    return ReviewRepository(session=db_session, auto_commit=False, auto_refresh=False)
@@ -1,28 +1,43 @@
 """Repository for User database operations."""
 
-from advanced_alchemy.repository import SQLAlchemySyncRepository
+from advanced_alchemy.repository import SQLAlchemyAsyncRepository
 from litestar.dto import DTOData
-from pwdlib import PasswordHash
-from sqlalchemy.orm import Session
-
-from app.models import User
-
-password_hasher = PasswordHash.recommended()
-
-
-class UserRepository(SQLAlchemySyncRepository[User]):
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import with_expression
+
+from app.models import Loan, Review, User
+from app.passwords import password_pool
+from app.repositories.batch import BatchLookupMixin
+from app.repositories.pagination import KeysetPaginationMixin
+
+# perfil de carga de UserReadDTO: conteos en vez del historial completo
+USER_READ_PROFILE = [
+    with_expression(
+        User.loan_count,
+        select(func.count(Loan.id)).where(Loan.user_id == User.id).correlate(User).scalar_subquery(),
+    ),
+    with_expression(
+        User.review_count,
+        select(func.count(Review.id)).where(Review.user_id == User.id).correlate(User).scalar_subquery(),
+    ),
+]
+
+
+class UserRepository(KeysetPaginationMixin, BatchLookupMixin, SQLAlchemyAsyncRepository[User]):
     """Repository for user database operations."""
 
     model_type = User
+    loader_options = USER_READ_PROFILE
 
-    def add_with_hashed_password(self, data: DTOData[User]):
+    async def add_with_hashed_password(self, data: DTOData[User]):
         """Add user with hashed password."""
         data_dict = data.as_builtins()
-        data_dict["password"] = password_hasher.hash(data_dict["password"])
+        data_dict["password"] = await password_pool.hash(data_dict["password"])
 
-        return self.add(User(**data_dict))
+        return await self.add(User(**data_dict))
 
 
-async def provide_user_repo(db_session: Session) -> UserRepository:
-    """Provide user repository instance with auto-commit."""
-    return UserRepository(session=db_session, auto_commit=True)
+async def provide_user_repo(db_session: AsyncSession) -> UserRepository:
+    """Provide user repository instance; it only flushes, the request commits once at the end."""
+    return UserRepository(session=db_session, auto_commit=False, auto_refresh=False)
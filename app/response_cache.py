@@ -0,0 +1,165 @@
+"""HTTP response cache with strong ETags for the catalog read endpoints."""
+
+import hashlib
+import uuid
+
+import msgspec
+from litestar.stores.base import Store
+from litestar.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.cache import build_redis_store
+from app.config import settings
+from app.db import route_reads_to_replica
+
+VERSION_KEY = "catalog:version"
+
+
+class CachedResponse(msgspec.Struct, array_like=True):
+    """A fully buffered 200 response."""
+
+    etag: str
+    headers: list[tuple[bytes, bytes]]
+    body: bytes
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match usa comparación débil: se ignora el prefijo W/
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+class CatalogResponseCache:
+    """Caches serialized catalog responses until the next catalog write.
+
+    Las claves incluyen una versión guardada en el store. ``invalidate`` la
+    reemplaza, así que todas las entradas anteriores quedan inalcanzables de una
+    vez y expiran solas. Una respuesta calculada durante una escritura queda
+    guardada bajo la versión vieja y nunca se sirve.
+
+    Solo se activa con un store compartido (Redis): con un caché por proceso los
+    otros workers seguirían sirviendo la versión vieja y las invalidaciones de la
+    CLI no llegarían al servidor.
+    """
+
+    def __init__(self, ttl: int, redis_url: str | None) -> None:
+        self.ttl = ttl
+        self.redis_url = redis_url
+        self._store: Store | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.redis_url is not None
+
+    @property
+    def store(self) -> Store:
+        if self._store is None:
+            self._store = build_redis_store(self.redis_url, namespace="library_response_cache")
+        return self._store
+
+    async def close(self) -> None:
+        """Close the connections to the store (app shutdown, end of a CLI command)."""
+        # el cliente de Redis queda atado al event loop: el próximo uso arma uno nuevo
+        store, self._store = self._store, None
+        if store is not None:
+            await store.__aexit__(None, None, None)
+
+    async def _version(self) -> str:
+        version = await self.store.get(VERSION_KEY)
+        if version is None:
+            version = uuid.uuid4().hex.encode()
+            await self.store.set(VERSION_KEY, version)
+        return version.decode()
+
+    async def invalidate(self) -> None:
+        """Make every cached response stale (called after catalog writes)."""
+        if self.enabled:
+            await self.store.set(VERSION_KEY, uuid.uuid4().hex)
+
+    async def key_for(self, scope: Scope) -> str:
+        headers = dict(scope["headers"])
+        accept = headers.get(b"accept", b"").decode("latin-1")
+        query = scope["query_string"].decode("latin-1")
+        return f"catalog:{await self._version()}:{scope['path']}?{query}|{accept}"
+
+    async def get(self, key: str) -> CachedResponse | None:
+        raw = await self.store.get(key)
+        return msgspec.msgpack.decode(raw, type=CachedResponse) if raw is not None else None
+
+    async def set(self, key: str, response: CachedResponse) -> None:
+        await self.store.set(key, msgspec.msgpack.encode(response), expires_in=self.ttl)
+
+
+catalog_cache = CatalogResponseCache(ttl=settings.response_cache_ttl, redis_url=settings.response_cache_redis_url)
+
+
+class ResponseCacheMiddleware:
+    """Serves GET requests from ``catalog_cache`` and answers If-None-Match with 304.
+
+    Solo se guardan las respuestas 200; los errores siempre llegan al handler.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "GET" or not catalog_cache.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = dict(scope["headers"]).get(b"if-none-match", b"").decode("latin-1")
+        key = await catalog_cache.key_for(scope)
+        cached = await catalog_cache.get(key)
+        if cached is None:
+            # lo que se guarda se sirve hasta la próxima escritura: leerlo del primario, no de una réplica atrasada
+            route_reads_to_replica(False)
+            cached = await self._render(scope, receive, send)
+            if cached is None:
+                return
+            await catalog_cache.set(key, cached)
+
+        if if_none_match and _matches(if_none_match, cached.etag):
+            await send({"type": "http.response.start", "status": 304, "headers": self._validators(cached)})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        headers = [*cached.headers, *self._validators(cached)]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": cached.body, "more_body": False})
+
+    @staticmethod
+    def _validators(cached: CachedResponse) -> list[tuple[bytes, bytes]]:
+        # no-cache: el cliente puede guardar la respuesta pero debe revalidarla con el ETag
+        return [(b"etag", cached.etag.encode()), (b"cache-control", b"no-cache")]
+
+    async def _render(self, scope: Scope, receive: Receive, send: Send) -> CachedResponse | None:
+        """Run the handler and buffer a 200 response; anything else is passed through untouched."""
+        start: Message | None = None
+        chunks: list[bytes] = []
+        passthrough = False
+
+        async def capture(message: Message) -> None:
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                if message["status"] != 200:
+                    passthrough = True
+                    await send(message)
+                else:
+                    start = message
+            elif passthrough:
+                await send(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, capture)
+        if passthrough or start is None:
+            return None
+
+        body = b"".join(chunks)
+        headers = [
+            (name, value)
+            for name, value in start.get("headers", [])
+            if name.lower() not in (b"etag", b"cache-control", b"content-length")
+        ]
+        headers.append((b"content-length", str(len(body)).encode()))
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        return CachedResponse(etag=etag, headers=headers, body=body)
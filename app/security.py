@@ -1,25 +1,126 @@
 """OAuth2 authentication and security configuration."""
 
+import uuid
+
 from litestar.connection import ASGIConnection
 from litestar.security.jwt import OAuth2PasswordBearerAuth, Token
+from litestar.stores.base import Store
 
+from app.cache import TTLCache, build_redis_store
 from app.config import settings
+from app.metrics import Gauge, registry
 from app.models import User
 from app.repositories.user import UserRepository
 
+VERSION_KEY = "principals:version"
+
+
+class PrincipalCache:
+    """Users already resolved per token subject, valid until the next user write in any worker.
+
+    Cada worker guarda los ``User`` en memoria junto con la versión de los
+    principals que había en el store compartido (Redis) cuando los leyó; cada
+    hit la compara con la actual. ``invalidate`` la reemplaza, así que un usuario
+    borrado, desactivado o con la contraseña cambiada deja de autenticarse desde
+    el caché en todos los workers a la vez.
+
+    Solo se activa con un store compartido: con un caché por proceso los otros
+    workers seguirían autenticando al usuario hasta ``principal_cache_ttl``.
+    """
+
+    def __init__(self, ttl: float, maxsize: int, redis_url: str | None) -> None:
+        self.redis_url = redis_url
+        self.hits = 0
+        self.misses = 0
+        self._entries: TTLCache[str, tuple[str, User]] = TTLCache(ttl=ttl, maxsize=maxsize)
+        self._store: Store | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._entries.ttl > 0 and self._entries.maxsize > 0 and self.redis_url is not None
+
+    @property
+    def store(self) -> Store:
+        if self._store is None:
+            self._store = build_redis_store(self.redis_url, namespace="library_principals")
+        return self._store
+
+    async def close(self) -> None:
+        """Close the connections to the store (app shutdown)."""
+        # el cliente de Redis queda atado al event loop: el próximo uso arma uno nuevo
+        store, self._store = self._store, None
+        if store is not None:
+            await store.__aexit__(None, None, None)
+
+    async def version(self) -> str:
+        """Return the current principals version, creating it if the store has none."""
+        version = await self.store.get(VERSION_KEY)
+        if version is None:
+            version = uuid.uuid4().hex.encode()
+            await self.store.set(VERSION_KEY, version)
+        return version.decode()
+
+    def get(self, subject: str, version: str) -> User | None:
+        """Return the cached user if it was read under ``version``."""
+        entry = self._entries.get(subject)
+        if entry is None or entry[0] != version:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+
+    async def set(self, subject: str, user: User, version: str) -> None:
+        """Cache a user read when ``version`` was current; skipped if a write happened meanwhile."""
+        if await self.version() == version:
+            self._entries.set(subject, (version, user))
+
+    async def invalidate(self) -> None:
+        """Make every cached principal stale in every worker (called after user writes)."""
+        self._entries.clear()
+        if self.enabled:
+            await self.store.set(VERSION_KEY, uuid.uuid4().hex)
+
+
+principal_cache = PrincipalCache(
+    ttl=settings.principal_cache_ttl,
+    maxsize=settings.principal_cache_size,
+    redis_url=settings.response_cache_redis_url,
+)
+registry.register(
+    Gauge("principal_cache_hits_total", "Principal cache hits.", lambda: principal_cache.hits, kind="counter")
+)
+registry.register(
+    Gauge("principal_cache_misses_total", "Principal cache misses.", lambda: principal_cache.misses, kind="counter")
+)
+
 
 async def retrieve_user_handler(token: Token, _: ASGIConnection) -> User | None:
     """Retrieve user based on JWT token."""
     from app.db import sqlalchemy_config
 
-    with sqlalchemy_config.get_session() as session:
+    # la versión se toma antes de leer: si una escritura la cambia mientras tanto, no se guarda
+    version = await principal_cache.version() if principal_cache.enabled else None
+    if version is not None:
+        user = principal_cache.get(token.sub, version)
+        if user is not None:
+            return user
+
+    async with sqlalchemy_config.get_session() as session:
         users_repo = UserRepository(session=session)
 
         try:
-            return users_repo.get_one(username=token.sub)
+            user = await users_repo.get_one(username=token.sub)
         except Exception:
             return None
 
+    # los usuarios desactivados no se autentican
+    if not user.is_active:
+        return None
+
+    if version is not None:
+        await principal_cache.set(token.sub, user, version)
+    return user
+
 
 oauth2_auth = OAuth2PasswordBearerAuth[User](
     retrieve_user_handler=retrieve_user_handler,
@@ -0,0 +1,42 @@
+"""Compare two benchmark result files endpoint by endpoint.
+
+Uso::
+
+    python -m benchmarks.compare benchmarks/results/antes.json benchmarks/results/despues.json
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+METRICS = ("rps", "p50", "p95", "p99")
+
+
+def _change(before: float, after: float) -> str:
+    if not before:
+        return "   n/a"
+    return f"{(after - before) / before * 100:+6.1f}%"
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("before", type=Path)
+    parser.add_argument("after", type=Path)
+    args = parser.parse_args(argv)
+
+    before = json.loads(args.before.read_text())
+    after = json.loads(args.after.read_text())
+    print(f"{before['meta']['revision']} -> {after['meta']['revision']} ({after['meta']['workload']}, scale {after['meta']['scale']})")
+
+    header = f"{'endpoint':<32}" + "".join(f" {metric:>20}" for metric in METRICS)
+    print(header)
+    rows = {**before["endpoints"], "TOTAL": before["total"]}
+    rows_after = {**after["endpoints"], "TOTAL": after["total"]}
+    for endpoint in [name for name in rows_after if name in rows]:
+        old, new = rows[endpoint], rows_after[endpoint]
+        cells = "".join(f" {old[metric]:>6} → {new[metric]:>6} {_change(old[metric], new[metric])}" for metric in METRICS)
+        print(f"{endpoint:<32}{cells}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Microbenchmark: encode time and payload size of a listing page per DTO and format.
+
+Uso::
+
+    python -m benchmarks.encoding --rows 100 --repeat 200
+
+Codifica páginas de libros y préstamos armadas en memoria (sin base de datos)
+con el DTO completo, con el resumen por defecto y con un ``?fields=`` angosto,
+pasando por el mismo DTO y encoders (JSON y MessagePack) que usan los handlers.
+También mide lo que tarda el cliente en decodificar cada cuerpo.
+"""
+
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import Any, Callable
+
+from litestar import Litestar, get
+from litestar.pagination import CursorPagination
+from litestar.serialization import decode_json, decode_msgpack, encode_json, encode_msgpack
+
+from app.datagen import WORDS
+from app.dtos.book import BOOK_SUMMARY_FIELDS, BookReadDTO, BookSummaryDTO
+from app.dtos.loan import LOAN_SUMMARY_FIELDS, LoanReadDTO, LoanSummaryDTO
+from app.models import Book, Category, Loan, LoanStatus, User
+
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _book_values(rng: random.Random, book_id: int) -> dict[str, Any]:
+    return {
+        "id": book_id,
+        "title": " ".join(rng.sample(WORDS, 3)).capitalize() + f" {book_id}",
+        "author": f"{rng.choice(WORDS).capitalize()} {rng.choice(WORDS).capitalize()}",
+        "isbn": f"ISBN-{book_id:09d}",
+        "pages": rng.randint(80, 900),
+        "published_year": rng.randint(1900, 2025),
+        "stock": rng.randint(0, 5),
+        "description": " ".join(rng.choices(WORDS, k=30)),
+        "language": "es",
+        "publisher": f"Editorial {rng.choice(WORDS).capitalize()}",
+        "review_count": 10,
+        "rating_sum": 42,
+        **{f"rating_{rating}_count": 2 for rating in range(1, 6)},
+        "created_at": NOW,
+        "updated_at": NOW,
+    }
+
+
+def _loan_values(rng: random.Random, loan_id: int) -> dict[str, Any]:
+    loan_dt = date(2025, 1, 1) + timedelta(days=rng.randint(0, 300))
+    return {
+        "id": loan_id,
+        "user_id": rng.randint(1, 500),
+        "book_id": rng.randint(1, 1000),
+        "loan_dt": loan_dt,
+        "due_date": loan_dt + timedelta(days=14),
+        "return_dt": None,
+        "status": LoanStatus.ACTIVE,
+        "fine_amount": Decimal("0.00"),
+        "created_at": NOW,
+        "updated_at": NOW,
+    }
+
+
+def _only(values: dict[str, Any], fields: tuple[str, ...] | None) -> dict[str, Any]:
+    # como load_only: el resto de las columnas queda sin cargar en la instancia
+    return values if fields is None else {name: values[name] for name in fields}
+
+
+def books_page(rows: int, fields: tuple[str, ...] | None) -> CursorPagination[str, Book]:
+    rng = random.Random(1)
+    categories = [Category(id=n, name=f"Categoría {n}", created_at=NOW, updated_at=NOW) for n in range(3)]
+    items = []
+    for book_id in range(1, rows + 1):
+        book = Book(**_only(_book_values(rng, book_id), fields))
+        if fields is None:
+            book.categories = rng.sample(categories, 2)
+            book.loan_count = rng.randint(0, 50)
+        items.append(book)
+    return CursorPagination(items=items, results_per_page=rows, cursor="WyIyMDI2LTAxLTAxIiwgMV0")
+
+
+def loans_page(rows: int, fields: tuple[str, ...] | None) -> CursorPagination[str, Loan]:
+    rng = random.Random(1)
+    items = []
+    for loan_id in range(1, rows + 1):
+        values = _loan_values(rng, loan_id)
+        loan = Loan(**_only(values, fields))
+        if fields is None:
+            loan.user = User(
+                id=values["user_id"], username=f"user{values['user_id']}", fullname="Nombre Apellido",
+                password="x", email="user@example.com", is_active=True, created_at=NOW, updated_at=NOW,
+            )
+            loan.book = Book(**_book_values(rng, values["book_id"]))
+        items.append(loan)
+    return CursorPagination(items=items, results_per_page=rows, cursor="WyIyMDI2LTAxLTAxIiwgMV0")
+
+
+def _to_encodable(dto: type, model: type) -> Callable[[Any], Any]:
+    """DTO transfer of a cursor page, as a listing handler with ``return_dto=dto`` does it."""
+
+    @get("/", return_dto=dto, sync_to_thread=False)
+    def page() -> CursorPagination[str, model]:  # type: ignore[valid-type]
+        raise NotImplementedError
+
+    # registrar el handler arma el backend del DTO (sobre una copia del handler)
+    app = Litestar(route_handlers=[page])
+    # el DTO solo necesita el handler de la conexión para encontrar su backend
+    connection = SimpleNamespace(route_handler=app.routes[0].route_handlers[0])
+    return lambda data: dto(connection).data_to_encodable_type(data)
+
+
+def _time_ms(fn: Callable[[], Any], repeat: int) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100, help="filas por página")
+    parser.add_argument("--repeat", type=int, default=200, help="codificaciones por caso")
+    args = parser.parse_args(argv)
+
+    book_fields = ("id", "title", "author", "stock")
+    loan_fields = ("id", "status", "due_date")
+    # BookReadDTO/LoanReadDTO: lo que devolvían los listados antes de los resúmenes
+    cases = [
+        ("books BookReadDTO", BookReadDTO, Book, books_page, None),
+        ("books BookSummaryDTO", BookSummaryDTO, Book, books_page, BOOK_SUMMARY_FIELDS),
+        (f"books ?fields={','.join(book_fields[1:])}", BookSummaryDTO, Book, books_page, book_fields),
+        ("loans LoanReadDTO", LoanReadDTO, Loan, loans_page, None),
+        ("loans LoanSummaryDTO", LoanSummaryDTO, Loan, loans_page, LOAN_SUMMARY_FIELDS),
+        (f"loans ?fields={','.join(loan_fields[1:])}", LoanSummaryDTO, Loan, loans_page, loan_fields),
+    ]
+
+    print(f"{'caso':<36} {'formato':<8} {'encode ms':>10} {'decode ms':>10} {'bytes':>9} {'bytes/fila':>11}")
+    for name, dto, model, page, fields in cases:
+        to_encodable, data = _to_encodable(dto, model), page(args.rows, fields)
+        for fmt, encode, decode in (("json", encode_json, decode_json), ("msgpack", encode_msgpack, decode_msgpack)):
+            body = encode(to_encodable(data))
+            encode_ms = _time_ms(lambda: encode(to_encodable(data)), args.repeat)
+            decode_ms = _time_ms(lambda: decode(body), args.repeat)
+            print(
+                f"{name:<36} {fmt:<8} {encode_ms:>10.3f} {decode_ms:>10.3f} {len(body):>9} {len(body) / args.rows:>11.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
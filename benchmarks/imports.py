@@ -0,0 +1,124 @@
+"""Book import regression check: re-importing an existing isbn only changes what the file brings.
+
+Uso::
+
+    python -m benchmarks.imports --database-url postgresql+psycopg:///library_bench
+
+Importa con ``BookImporter`` (como la CLI: una transacción por archivo) un libro
+nuevo y después lo vuelve a importar con el stock, la descripción y la editorial
+vacíos o sin esas columnas: tienen que quedar como estaban. También importa un
+CSV con una descripción de varias líneas entre comillas, que tiene que llegar
+entera como una sola fila. Falla (exit 1) si algo de eso no se cumple. Los
+libros que crea se borran al final.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import uuid
+from typing import Any, AsyncIterator
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+
+HEADER = "title,author,isbn,pages,published_year,stock,description,language,publisher"
+
+
+async def _lines(text: str) -> AsyncIterator[str]:
+    for line in text.split("\n"):
+        yield line
+
+
+async def _import(engine, text: str) -> Any:
+    from app.book_import import BookImporter, iter_records
+
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        report = await BookImporter(session).run(iter_records(_lines(text), "csv"))
+        await session.commit()
+    return report
+
+
+async def _book(engine, isbn: str) -> dict[str, Any] | None:
+    from app.models import Book
+
+    async with engine.connect() as connection:
+        row = (
+            await connection.execute(
+                select(Book.pages, Book.stock, Book.description, Book.publisher).where(Book.isbn == isbn)
+            )
+        ).one_or_none()
+    return row._asdict() if row is not None else None
+
+
+async def check(database_url: str) -> list[tuple[str, bool, str]]:
+    """Run the imports and return ``(name, ok, detail)`` for every expectation."""
+    from app.models import Book
+
+    engine = create_async_engine(database_url, poolclass=NullPool)
+    tag = uuid.uuid4().hex[:12]
+    isbn, new_isbn, multiline_isbn = f"IMPORT-{tag}", f"IMPORT-{tag}-new", f"IMPORT-{tag}-ml"
+    results = []
+
+    def expect(name: str, actual: Any, expected: Any) -> None:
+        results.append((name, actual == expected, f"{actual!r} (se esperaba {expected!r})"))
+
+    try:
+        await _import(engine, f"{HEADER}\nImport {tag},Autor,{isbn},100,2000,4,Original,es,Editorial")
+        original = await _book(engine, isbn)
+        expect("alta con stock 4", original["stock"], 4)
+
+        # mismo isbn con stock, descripción y editorial vacíos: solo cambian las páginas
+        report = await _import(engine, f"{HEADER}\nImport {tag},Autor,{isbn},120,2000,,,es,")
+        expect("reimportación con celdas vacías: actualizados", report.updated, 1)
+        expect("reimportación con celdas vacías: libro", await _book(engine, isbn), {**original, "pages": 120})
+
+        # archivo sin las columnas stock, description ni publisher
+        report = await _import(
+            engine, f"title,author,isbn,pages,published_year,language\nImport {tag},Autor,{isbn},130,2000,es"
+        )
+        expect("reimportación sin columnas: errores", report.errors, [])
+        expect("reimportación sin columnas: libro", await _book(engine, isbn), {**original, "pages": 130})
+
+        # un libro nuevo sin stock recibe el stock por defecto
+        await _import(engine, f"{HEADER}\nImport {tag} nuevo,Autor,{new_isbn},100,2000,,,es,")
+        expect("alta sin stock", ((await _book(engine, new_isbn)) or {}).get("stock"), 1)
+
+        description = 'Primera línea, con coma\nSegunda con ""comillas""\n\nCuarta'
+        report = await _import(
+            engine, f'{HEADER}\nImport {tag} ml,Autor,{multiline_isbn},100,2000,1,"{description}",es,\n'
+        )
+        expect("descripción de varias líneas: filas", (report.total_rows, report.inserted, report.errors), (1, 1, []))
+        expect(
+            "descripción de varias líneas: texto",
+            ((await _book(engine, multiline_isbn)) or {}).get("description"),
+            description.replace('""', '"'),
+        )
+    finally:
+        async with engine.begin() as connection:
+            await connection.execute(delete(Book).where(Book.isbn.in_([isbn, new_isbn, multiline_isbn])))
+        await engine.dispose()
+    return results
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"), help="base migrada")
+    args = parser.parse_args(argv)
+    if not args.database_url:
+        parser.error("se necesita --database-url (o DATABASE_URL)")
+    # antes de importar app: app.config lee DATABASE_URL al importarse
+    os.environ["DATABASE_URL"] = args.database_url
+
+    results = asyncio.run(check(args.database_url))
+    failed = False
+    for name, ok, detail in results:
+        print(f"{'ok' if ok else 'FAIL':<4} {name}" + ("" if ok else f": {detail}"))
+        failed = failed or not ok
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
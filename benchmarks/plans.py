@@ -0,0 +1,168 @@
+"""Plan regression check: the loan, review and category lookups must use their indexes.
+
+Uso::
+
+    python -m benchmarks.plans --database-url postgresql+psycopg:///library_bench --scale 1
+
+Siembra la base si está vacía (como ``benchmarks.run``), corre cada lookup con los
+repositorios reales, captura el SQL que emiten y le pide a Postgres el plan con
+``EXPLAIN``. Falla (exit 1) si algún plan recorre ``loans``, ``reviews`` o
+``book_categories`` con un Seq Scan.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Awaitable, Callable, Iterator
+
+from sqlalchemy import event, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+
+# tablas que nunca deberían leerse enteras para un lookup
+INDEXED_TABLES = frozenset({"loans", "reviews", "book_categories"})
+
+
+@dataclass
+class Sample:
+    """Ids that exist in the seeded data, used as lookup parameters."""
+
+    user_id: int
+    book_id: int
+    category_id: int
+
+
+@dataclass
+class Result:
+    """Scans of every statement a lookup ran."""
+
+    name: str
+    scans: list[str] = field(default_factory=list)
+    seq_scans: list[str] = field(default_factory=list)
+
+
+def _scan_nodes(plan: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    # los Bitmap Index Scan no tienen "Relation Name" pero sí el índice usado
+    if "Relation Name" in plan or "Index Name" in plan:
+        yield plan
+    for child in plan.get("Plans", ()):
+        yield from _scan_nodes(child)
+
+
+def _lookups() -> dict[str, Callable[[AsyncSession, Sample], Awaitable[Any]]]:
+    # import tardío: app.config lee DATABASE_URL al importarse
+    from app.models import Loan, Review
+    from app.repositories.book import BookRepository
+    from app.repositories.loan import LoanRepository
+    from app.repositories.pagination import KeysetParams
+    from app.repositories.review import ReviewRepository
+
+    def books(session: AsyncSession) -> BookRepository:
+        return BookRepository(session=session, auto_commit=False, auto_refresh=False)
+
+    def loans(session: AsyncSession) -> LoanRepository:
+        return LoanRepository(session=session, auto_commit=False, auto_refresh=False)
+
+    def reviews(session: AsyncSession) -> ReviewRepository:
+        return ReviewRepository(session=session, auto_commit=False, auto_refresh=False)
+
+    page = KeysetParams(after=None, limit=20)
+    return {
+        "GET /books/{id} (loan_count)": lambda s, ids: books(s).get(ids.book_id),
+        "GET /books/by-category/{id}": lambda s, ids: books(s).find_by_category(ids.category_id, page),
+        "GET /loans/user/{id}": lambda s, ids: loans(s).get_user_loan_history(ids.user_id, page),
+        "GET /users/{id}/fines": lambda s, ids: loans(s).get_user_fines(ids.user_id),
+        "GET /loans/overdue": lambda s, ids: loans(s).get_overdue_loans(),
+        "POST /loans/overdue/sweep": lambda s, ids: loans(s).mark_overdue_loans(),
+        "préstamos de un libro": lambda s, ids: loans(s).list(Loan.book_id == ids.book_id),
+        "préstamos de un día": lambda s, ids: loans(s).list(Loan.loan_dt == date.today()),
+        "reseñas de un libro": lambda s, ids: reviews(s).list(Review.book_id == ids.book_id),
+        "reseñas de un usuario": lambda s, ids: reviews(s).list(Review.user_id == ids.user_id),
+    }
+
+
+async def _sample(session: AsyncSession) -> Sample:
+    from app.models import Loan, book_categories
+
+    user_id, book_id = (await session.execute(select(Loan.user_id, Loan.book_id).order_by(Loan.id).limit(1))).one()
+    category_id = await session.scalar(
+        select(book_categories.c.category_id).order_by(book_categories.c.book_id).limit(1)
+    )
+    return Sample(user_id=user_id, book_id=book_id, category_id=category_id)
+
+
+async def check(database_url: str) -> list[Result]:
+    """EXPLAIN every lookup and return the scans each one used."""
+    engine = create_async_engine(database_url, poolclass=NullPool)
+    captured: list[tuple[str, Any]] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany) -> None:
+        if not executemany:
+            captured.append((statement, parameters))
+
+    try:
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            await session.execute(text("ANALYZE"))
+            sample = await _sample(session)
+            results = []
+            for name, lookup in _lookups().items():
+                captured.clear()
+                event.listen(engine.sync_engine, "before_cursor_execute", capture)
+                try:
+                    await lookup(session, sample)
+                finally:
+                    event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+                result = Result(name)
+                connection = await session.connection()
+                for statement, parameters in captured:
+                    explained = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+                    for node in _scan_nodes(explained.scalar_one()[0]["Plan"]):
+                        relation = node.get("Relation Name")
+                        scan = " ".join(filter(None, (node["Node Type"], node.get("Index Name"), relation and f"on {relation}")))
+                        result.scans.append(scan)
+                        if node["Node Type"] == "Seq Scan" and relation in INDEXED_TABLES:
+                            result.seq_scans.append(scan)
+                results.append(result)
+                session.expunge_all()
+            # el sweep corrió de verdad: no dejar la base modificada
+            await session.rollback()
+        return results
+    finally:
+        await engine.dispose()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"), help="base migrada (se siembra si está vacía)")
+    parser.add_argument("--scale", type=int, default=1, help="factor de escala si hay que sembrar")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+    if not args.database_url:
+        parser.error("se necesita --database-url (o DATABASE_URL)")
+    # antes de importar app: app.config lee DATABASE_URL al importarse
+    os.environ["DATABASE_URL"] = args.database_url
+
+    from benchmarks.seed import seed
+
+    if asyncio.run(seed(args.database_url, args.scale, args.seed)):
+        print("sembrando datos...")
+    results = asyncio.run(check(args.database_url))
+
+    failed = False
+    for result in results:
+        status = "FAIL" if result.seq_scans else "ok"
+        print(f"{status:<4} {result.name}")
+        for scan in result.scans:
+            print(f"       {scan}")
+        failed = failed or bool(result.seq_scans)
+    if failed:
+        print("hay lookups que recorren una tabla entera (Seq Scan); falta o no se usa un índice")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
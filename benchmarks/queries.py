@@ -0,0 +1,104 @@
+"""Query-count regression check: a page of 100 rows costs a fixed number of SQL statements.
+
+Uso::
+
+    python -m benchmarks.queries --database-url postgresql+psycopg:///library_bench
+
+Pide cada listado con páginas de 10 y de 100 filas y lee la cantidad de
+sentencias SQL que ejecutó el request del header ``Server-Timing`` (el contador
+por request de ``app.metrics``). Falla (exit 1) si algún endpoint supera su
+presupuesto o si la página de 100 cuesta más sentencias que la de 10, que es
+lo que pasa cuando vuelve un N+1. El caché de respuestas tiene que estar
+apagado: un hit no ejecuta SQL.
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import sys
+
+import httpx
+
+# lo que esperan los perfiles de carga de los repositorios para una página de cualquier tamaño
+QUERY_BUDGETS: dict[str, tuple[str, int]] = {
+    # BookSummaryDTO: solo las columnas pedidas, sin relaciones
+    "GET /books/": ("/books/?limit={n}", 1),
+    "GET /books/ (?fields= todos)": (
+        "/books/?limit={n}&fields=id,title,author,isbn,pages,published_year,stock,description,language,"
+        "publisher,review_count,rating_sum,rating_1_count,rating_2_count,rating_3_count,rating_4_count,rating_5_count",
+        1,
+    ),
+    # BookReadDTO: libros con loan_count en el mismo SELECT + categorías en un selectinload
+    "GET /books/batch": ("/books/batch?ids={ids}", 2),
+    # LoanReadDTO: usuario y libro en joins del mismo SELECT
+    "GET /loans/batch": ("/loans/batch?ids={ids}", 1),
+    "GET /loans/": ("/loans/?limit={n}", 1),
+    # ReviewReadDTO: usuario y libro en joins del mismo SELECT
+    "GET /reviews/": ("/reviews/?limit={n}", 1),
+}
+PAGE_SIZES = (10, 100)
+
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+async def count_queries(base_url: str) -> dict[str, dict[int, int]]:
+    """Return the statements each endpoint ran for every page size."""
+    counts: dict[str, dict[int, int]] = {}
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        for endpoint, (url, _) in QUERY_BUDGETS.items():
+            counts[endpoint] = {}
+            for n in PAGE_SIZES:
+                response = await client.get(url.format(n=n, ids=",".join(str(i) for i in range(1, n + 1))))
+                response.raise_for_status()
+                match = SERVER_TIMING_QUERIES.search(response.headers.get("server-timing", ""))
+                if match is None:
+                    raise RuntimeError(f"{endpoint}: la respuesta no trae Server-Timing (¿vino del caché?)")
+                counts[endpoint][n] = int(match.group(1))
+    return counts
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", help="servidor ya corriendo (sin RESPONSE_CACHE_REDIS_URL)")
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"), help="base migrada (se siembra si está vacía)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        if not args.database_url:
+            parser.error("se necesita --database-url (o DATABASE_URL) para levantar la app")
+        # antes de importar app: app.config lee el entorno al importarse (y el servidor lo hereda)
+        os.environ["DATABASE_URL"] = args.database_url
+        os.environ.pop("RESPONSE_CACHE_REDIS_URL", None)
+
+        from benchmarks.run import start_app
+        from benchmarks.seed import seed
+
+        if asyncio.run(seed(args.database_url, 1, args.seed)):
+            print("sembrando datos...")
+        server, base_url = start_app(workers=1)
+    try:
+        counts = asyncio.run(count_queries(base_url))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    print(f"{'endpoint':<32}" + "".join(f" {f'{n} filas':>9}" for n in PAGE_SIZES) + f" {'máximo':>9}")
+    failed = False
+    for endpoint, by_size in counts.items():
+        budget = QUERY_BUDGETS[endpoint][1]
+        ok = max(by_size.values()) <= budget and by_size[PAGE_SIZES[-1]] <= by_size[PAGE_SIZES[0]]
+        failed = failed or not ok
+        cells = "".join(f" {by_size[n]:>9}" for n in PAGE_SIZES)
+        print(f"{endpoint:<32}{cells} {budget:>9}{'' if ok else '  FAIL'}")
+    if failed:
+        print("hay listados que ejecutan más sentencias de las esperadas (¿un N+1 o una relación perezosa nueva?)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""Load-test the API and save per-endpoint throughput and latency as JSON.
+
+Uso::
+
+    python -m benchmarks.run --database-url postgresql+psycopg:///library_bench --scale 5 --duration 60
+
+Sin ``--base-url`` levanta ``app`` con uvicorn contra ``--database-url`` (y lo
+siembra si la base está vacía); con ``--base-url`` usa un servidor ya corriendo.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(q * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def _summary(latencies: list[float], errors: int, duration: float) -> dict:
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "rps": round(len(ordered) / duration, 2),
+        # milisegundos
+        "p50": round(_percentile(ordered, 0.50) * 1000, 2),
+        "p95": round(_percentile(ordered, 0.95) * 1000, 2),
+        "p99": round(_percentile(ordered, 0.99) * 1000, 2),
+        "max": round(ordered[-1] * 1000, 2) if ordered else 0.0,
+    }
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_until_up(base_url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while True:
+            try:
+                if (await client.get("/")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"el servidor no respondió en {timeout}s")
+            await asyncio.sleep(0.2)
+
+
+def start_app(workers: int) -> tuple[subprocess.Popen, str]:
+    """Start ``app`` with uvicorn on a free port (inheriting DATABASE_URL) and wait until it answers."""
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        env=os.environ.copy(),
+    )
+    try:
+        asyncio.run(_wait_until_up(base_url))
+    except BaseException:
+        server.terminate()
+        raise
+    return server, base_url
+
+
+async def drive(base_url: str, workload: str, scale: int, seed: int, duration: float, warmup: float, concurrency: int) -> dict:
+    """Run ``concurrency`` virtual users for ``warmup + duration`` seconds."""
+    from benchmarks.workloads import WORKLOADS, Context
+
+    scenarios = WORKLOADS[workload]
+    latencies: dict[str, list[float]] = defaultdict(list)
+    errors: dict[str, int] = defaultdict(int)
+    measuring = False
+
+    def record(endpoint: str, seconds: float, status: int) -> None:
+        if not measuring:
+            return
+        latencies[endpoint].append(seconds)
+        if status == 0 or status >= 400:
+            errors[endpoint] += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+
+        async def virtual_user(n: int, stop_at: float) -> None:
+            # un generador por usuario virtual: misma secuencia de requests con la misma semilla
+            ctx = Context(client=client, rng=random.Random(seed * 1000 + n), scale=scale, record=record)
+            population, weights = list(scenarios), list(scenarios.values())
+            while time.monotonic() < stop_at:
+                try:
+                    await ctx.rng.choices(population, weights)[0](ctx)
+                except httpx.TransportError:
+                    # ya quedó registrado como error; el usuario virtual sigue con otro escenario
+                    continue
+
+        if warmup > 0:
+            stop_at = time.monotonic() + warmup
+            await asyncio.gather(*(virtual_user(n, stop_at) for n in range(concurrency)))
+
+        measuring = True
+        started = time.monotonic()
+        stop_at = started + duration
+        await asyncio.gather(*(virtual_user(n, stop_at) for n in range(concurrency)))
+        elapsed = time.monotonic() - started
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    return {
+        "endpoints": {
+            endpoint: _summary(values, errors[endpoint], elapsed) for endpoint, values in sorted(latencies.items())
+        },
+        "total": _summary(all_latencies, sum(errors.values()), elapsed),
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", help="servidor ya corriendo (no se levanta ni se siembra nada)")
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"), help="base para sembrar y levantar la app")
+    parser.add_argument("--workload", default="mixed", help="una de las mezclas de benchmarks.workloads.WORKLOADS")
+    parser.add_argument("--scale", type=int, default=1, help="factor de escala de los datos sembrados")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="vaciar las tablas y volver a sembrar")
+    parser.add_argument("--duration", type=float, default=30, help="segundos medidos")
+    parser.add_argument("--warmup", type=float, default=5, help="segundos previos que no se miden")
+    parser.add_argument("--concurrency", type=int, default=32, help="usuarios virtuales")
+    parser.add_argument("--workers", type=int, default=1, help="workers de uvicorn")
+    parser.add_argument("--output", type=Path, default=None, help="archivo JSON de resultados")
+    args = parser.parse_args(argv)
+
+    if args.base_url is None and args.database_url:
+        # antes de importar app/benchmarks: app.config lee DATABASE_URL al importarse
+        # (el servidor levantado abajo hereda este entorno)
+        os.environ["DATABASE_URL"] = args.database_url
+
+    from benchmarks.workloads import WORKLOADS
+
+    if args.workload not in WORKLOADS:
+        parser.error(f"workload desconocido: {args.workload} (opciones: {', '.join(WORKLOADS)})")
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        if not args.database_url:
+            parser.error("se necesita --database-url (o DATABASE_URL) para levantar la app")
+        from benchmarks.seed import seed
+
+        seeded = asyncio.run(seed(args.database_url, args.scale, args.seed, reset=args.reset))
+        print("sembrando datos..." if seeded else "la base ya tiene datos; se reutilizan (--reset para volver a sembrar)")
+
+        server, base_url = start_app(args.workers)
+
+    try:
+        results = asyncio.run(
+            drive(base_url, args.workload, args.scale, args.seed, args.duration, args.warmup, args.concurrency)
+        )
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    run = {
+        "meta": {
+            "revision": _git_revision(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "workload": args.workload,
+            "scale": args.scale,
+            "seed": args.seed,
+            "duration": args.duration,
+            "concurrency": args.concurrency,
+            "workers": args.workers,
+        },
+        **results,
+    }
+
+    output = args.output
+    if output is None:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        output = RESULTS_DIR / f"{stamp}-{run['meta']['revision'] or 'local'}-{args.workload}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(run, indent=2, ensure_ascii=False))
+
+    print(f"{'endpoint':<32} {'req':>7} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for endpoint, row in [*run["endpoints"].items(), ("TOTAL", run["total"])]:
+        print(
+            f"{endpoint:<32} {row['requests']:>7} {row['errors']:>5} {row['rps']:>8} "
+            f"{row['p50']:>8} {row['p95']:>8} {row['p99']:>8}"
+        )
+    print(f"resultados en {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""Seed the benchmark database at a configurable scale."""
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.datagen import GENERATED_PASSWORD, DataGenerator
+from app.models import Book
+
+BENCHMARK_PASSWORD = GENERATED_PASSWORD
+# stock de sobra: el benchmark mide checkout/return, no quedarse sin ejemplares
+BENCHMARK_EXTRA_STOCK = 1_000_000
+
+
+async def seed(database_url: str, scale: int, seed: int, reset: bool = False) -> bool:
+    """Fill the database at ``database_url``; returns False if it already had data and ``reset`` is off.
+
+    Usa su propio engine: no depende de qué DATABASE_URL vio app.config al importarse.
+    """
+    engine = create_async_engine(database_url, poolclass=NullPool)
+    try:
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            generator = DataGenerator(session, scale=scale, seed=seed)
+            if reset:
+                await generator.reset()
+            elif not await generator.is_empty():
+                return False
+
+            await generator.run()
+            await session.execute(update(Book).values(stock=Book.stock + BENCHMARK_EXTRA_STOCK))
+            await session.commit()
+        return True
+    finally:
+        await engine.dispose()
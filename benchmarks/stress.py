@@ -0,0 +1,191 @@
+"""Concurrency stress check: many checkouts and returns racing for the copies of one book.
+
+Uso::
+
+    python -m benchmarks.stress --database-url postgresql+psycopg:///library_bench --workers 4 --concurrency 50
+
+Crea un libro con ``--stock`` ejemplares y lanza ``--concurrency`` clientes que
+lo piden prestado y lo devuelven ``--iterations`` veces cada uno (uno de cada
+cuatro por los endpoints bulk). Mientras tanto otra conexión mira la base: el
+stock nunca puede quedar negativo y stock + préstamos abiertos tiene que ser
+siempre ``--stock``. Al final no quedan préstamos abiertos y el stock vuelve al
+inicial. Falla (exit 1) si algo de eso no se cumple o hubo respuestas 5xx.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+
+import httpx
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+
+@dataclass
+class Observed:
+    """What the monitor saw in the database while the clients ran."""
+
+    snapshots: int = 0
+    min_stock: int | None = None
+    # (stock, préstamos abiertos) que no suman el stock inicial
+    violations: list[tuple[int, int]] = field(default_factory=list)
+
+
+async def _snapshot(connection, book_id: int) -> tuple[int, int]:
+    from app.models import Book, Loan, LoanStatus
+
+    open_loans = (
+        select(func.count())
+        .where(Loan.book_id == Book.id, Loan.status != LoanStatus.RETURNED)
+        .correlate(Book)
+        .scalar_subquery()
+    )
+    # una sola sentencia: ve un snapshot consistente de las dos tablas
+    return (await connection.execute(select(Book.stock, open_loans).where(Book.id == book_id))).one()
+
+
+async def _monitor(database_url: str, book_id: int, stock: int, observed: Observed, done: asyncio.Event) -> None:
+    engine = create_async_engine(database_url, poolclass=NullPool)
+    try:
+        async with engine.connect() as connection:
+            while not done.is_set():
+                current, open_loans = await _snapshot(connection, book_id)
+                await connection.rollback()
+                observed.snapshots += 1
+                observed.min_stock = current if observed.min_stock is None else min(observed.min_stock, current)
+                if current < 0 or current + open_loans != stock:
+                    observed.violations.append((current, open_loans))
+    finally:
+        await engine.dispose()
+
+
+async def _client(client: httpx.AsyncClient, rng: random.Random, user_id: int, book_id: int, iterations: int, statuses: Counter) -> None:
+    for _ in range(iterations):
+        bulk = rng.random() < 0.25
+        if bulk:
+            response = await client.post("/loans/bulk-checkout", json={"user_id": user_id, "book_ids": [book_id]})
+            loan_ids = [loan["id"] for loan in response.json()["loans"]] if response.status_code == 201 else []
+        else:
+            response = await client.post("/loans/", json={"user_id": user_id, "book_id": book_id})
+            loan_ids = [response.json()["id"]] if response.status_code == 201 else []
+        statuses[f"checkout {response.status_code}"] += 1
+        if not loan_ids:
+            continue
+
+        # retener el ejemplar un rato para que los demás encuentren el stock en 0
+        await asyncio.sleep(rng.uniform(0, 0.01))
+        if bulk:
+            response = await client.post("/loans/bulk-return", json={"loan_ids": loan_ids})
+        else:
+            response = await client.post(f"/loans/{loan_ids[0]}/return")
+        statuses[f"return {response.status_code}"] += 1
+
+
+async def stress(base_url: str, database_url: str, stock: int, concurrency: int, iterations: int, seed: int) -> tuple[Counter, Observed, tuple[int, int]]:
+    """Race the clients against one new book; returns response statuses, what the monitor saw and the final state."""
+    from app.models import User
+
+    engine = create_async_engine(database_url, poolclass=NullPool)
+    try:
+        async with engine.connect() as connection:
+            user_ids = list(await connection.scalars(select(User.id).order_by(User.id).limit(concurrency)))
+    finally:
+        await engine.dispose()
+    if not user_ids:
+        raise RuntimeError("la base no tiene usuarios; sembrarla primero")
+
+    statuses: Counter = Counter()
+    observed = Observed()
+    done = asyncio.Event()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        tag = uuid.uuid4().hex[:12]
+        book = {"title": f"Stress {tag}", "author": "Stress", "isbn": f"STRESS-{tag}", "pages": 100, "published_year": 2000, "stock": stock, "language": "es"}
+        response = await client.post("/books/", json=book)
+        response.raise_for_status()
+        book_id = response.json()["id"]
+
+        monitor = asyncio.create_task(_monitor(database_url, book_id, stock, observed, done))
+        try:
+            await asyncio.gather(
+                *(
+                    _client(client, random.Random(seed * 1000 + n), user_ids[n % len(user_ids)], book_id, iterations, statuses)
+                    for n in range(concurrency)
+                )
+            )
+        finally:
+            done.set()
+            await monitor
+
+    engine = create_async_engine(database_url, poolclass=NullPool)
+    try:
+        async with engine.connect() as connection:
+            final = await _snapshot(connection, book_id)
+    finally:
+        await engine.dispose()
+    return statuses, observed, final
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", help="servidor ya corriendo contra --database-url")
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"), help="base migrada (se siembra si está vacía)")
+    parser.add_argument("--stock", type=int, default=3, help="ejemplares del libro disputado")
+    parser.add_argument("--concurrency", type=int, default=50, help="clientes simultáneos")
+    parser.add_argument("--iterations", type=int, default=20, help="préstamos que intenta cada cliente")
+    parser.add_argument("--workers", type=int, default=4, help="workers de uvicorn")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+    if not args.database_url:
+        parser.error("se necesita --database-url (o DATABASE_URL)")
+    # antes de importar app: app.config lee DATABASE_URL al importarse (y el servidor hereda el entorno)
+    os.environ["DATABASE_URL"] = args.database_url
+
+    from benchmarks.run import start_app
+    from benchmarks.seed import seed
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        if asyncio.run(seed(args.database_url, 1, args.seed)):
+            print("sembrando datos...")
+        server, base_url = start_app(args.workers)
+    try:
+        statuses, observed, (final_stock, open_loans) = asyncio.run(
+            stress(base_url, args.database_url, args.stock, args.concurrency, args.iterations, args.seed)
+        )
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    for status, count in sorted(statuses.items()):
+        print(f"{status:<20} {count:>7}")
+    print(f"{observed.snapshots} lecturas del monitor, stock mínimo {observed.min_stock}")
+    print(f"final: stock {final_stock} (inicial {args.stock}), {open_loans} préstamos abiertos")
+
+    failures = []
+    if any(int(status.split()[-1]) >= 500 for status in statuses):
+        failures.append("hubo respuestas 5xx")
+    if observed.min_stock is not None and observed.min_stock < 0:
+        failures.append(f"el stock llegó a {observed.min_stock}")
+    if observed.violations:
+        failures.append(f"{len(observed.violations)} lecturas donde stock + préstamos abiertos != {args.stock}, p. ej. {observed.violations[0]}")
+    if (final_stock, open_loans) != (args.stock, 0):
+        failures.append("el stock final no volvió al inicial")
+    if not statuses["checkout 201"] or not statuses["checkout 400"] + statuses["checkout 409"]:
+        failures.append("no hubo contención: subir --concurrency o bajar --stock")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Weighted request mixes driven against the API."""
+
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+import httpx
+
+from app.datagen import FIRST_NAMES, LAST_NAMES, WORDS, DatasetSize
+from benchmarks.seed import BENCHMARK_PASSWORD
+
+# cada escenario hace uno o más requests y los registra con record(endpoint, segundos, status)
+Record = Callable[[str, float, int], None]
+
+
+@dataclass
+class Context:
+    """What a scenario needs to pick realistic parameters."""
+
+    client: httpx.AsyncClient
+    rng: random.Random
+    scale: int
+    record: Record
+    size: DatasetSize = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.size = DatasetSize.for_scale(self.scale)
+
+    async def request(self, endpoint: str, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request and record its latency under ``endpoint``."""
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.TransportError:
+            # conexión cortada o timeout: cuenta como error (status 0) y corta el escenario
+            self.record(endpoint, time.perf_counter() - start, 0)
+            raise
+        self.record(endpoint, time.perf_counter() - start, response.status_code)
+        return response
+
+
+async def browse_catalog(ctx: Context) -> None:
+    page = await ctx.request("GET /books/", "GET", "/books/", params={"limit": 20})
+    cursor = page.json().get("cursor") if page.status_code == 200 else None
+    if cursor:
+        await ctx.request("GET /books/ (page 2)", "GET", "/books/", params={"limit": 20, "after": cursor})
+    await ctx.request("GET /books/{id}", "GET", f"/books/{ctx.rng.randint(1, ctx.size.books)}")
+
+
+async def browse_categories(ctx: Context) -> None:
+    await ctx.request("GET /categories/", "GET", "/categories/")
+    category_id = ctx.rng.randint(1, ctx.size.categories)
+    await ctx.request("GET /books/by-category/{id}", "GET", f"/books/by-category/{category_id}", params={"limit": 20})
+
+
+async def rankings(ctx: Context) -> None:
+    await ctx.request("GET /books/most-reviewed", "GET", "/books/most-reviewed")
+    await ctx.request("GET /books/top-rated", "GET", "/books/top-rated", params={"min_reviews": 2})
+
+
+async def search(ctx: Context) -> None:
+    query = " ".join(ctx.rng.sample(WORDS, ctx.rng.choice((1, 2))))
+    await ctx.request("GET /books/search", "GET", "/books/search", params={"q": query})
+
+
+async def checkout_and_return(ctx: Context) -> None:
+    payload = {"user_id": ctx.rng.randint(1, ctx.size.users), "book_id": ctx.rng.randint(1, ctx.size.books)}
+    loan = await ctx.request("POST /loans/", "POST", "/loans/", json=payload)
+    if loan.status_code == 201:
+        await ctx.request("POST /loans/{id}/return", "POST", f"/loans/{loan.json()['id']}/return")
+
+
+async def loan_history(ctx: Context) -> None:
+    user_id = ctx.rng.randint(1, ctx.size.users)
+    await ctx.request("GET /loans/user/{id}", "GET", f"/loans/user/{user_id}", params={"limit": 20})
+
+
+async def login(ctx: Context) -> None:
+    data = {"username": f"user{ctx.rng.randint(1, ctx.size.users)}", "password": BENCHMARK_PASSWORD}
+    await ctx.request("POST /auth/login", "POST", "/auth/login", data=data)
+
+
+async def stats(ctx: Context) -> None:
+    await ctx.request("GET /books/stats", "GET", "/books/stats")
+
+
+# lecturas por id: existen en todas las versiones de la API, sirven para comparar el stack
+async def book_detail(ctx: Context) -> None:
+    await ctx.request("GET /books/{id}", "GET", f"/books/{ctx.rng.randint(1, ctx.size.books)}")
+
+
+async def user_detail(ctx: Context) -> None:
+    await ctx.request("GET /users/{id}", "GET", f"/users/{ctx.rng.randint(1, ctx.size.users)}")
+
+
+async def loan_detail(ctx: Context) -> None:
+    await ctx.request("GET /loans/{id}", "GET", f"/loans/{ctx.rng.randint(1, ctx.size.loans)}")
+
+
+async def search_catalog(ctx: Context) -> None:
+    word = ctx.rng.choice(WORDS)
+    # q es el parámetro de la búsqueda full-text; title el de la búsqueda por ILIKE que
+    # la precedía (cada versión ignora el otro), así la misma mezcla sirve de antes/después
+    await ctx.request("GET /books/search", "GET", "/books/search", params={"q": word, "title": word})
+
+
+async def search_author(ctx: Context) -> None:
+    # mismo formato de autor que app.datagen (un autor cada ~8 libros)
+    author = f"{ctx.rng.choice(FIRST_NAMES)} {ctx.rng.choice(LAST_NAMES)} {ctx.rng.randint(1, max(10, ctx.size.books // 8))}"
+    await ctx.request("GET /books/search/author", "GET", "/books/search/author", params={"author_name": author})
+
+
+Scenario = Callable[[Context], Awaitable[None]]
+
+# mezclas de escenarios con su peso relativo
+WORKLOADS: dict[str, dict[Scenario, int]] = {
+    "mixed": {
+        browse_catalog: 30,
+        browse_categories: 10,
+        rankings: 10,
+        search: 15,
+        checkout_and_return: 15,
+        loan_history: 10,
+        login: 5,
+        stats: 5,
+    },
+    "read": {
+        browse_catalog: 45,
+        browse_categories: 15,
+        rankings: 15,
+        search: 20,
+        stats: 5,
+    },
+    "write": {
+        checkout_and_return: 80,
+        loan_history: 20,
+    },
+    "login": {
+        login: 100,
+    },
+    # lecturas simples con mucha concurrencia: throughput del stack (sync vs async)
+    "throughput": {
+        book_detail: 50,
+        user_detail: 25,
+        loan_detail: 25,
+    },
+    # búsquedas sobre un catálogo grande (correr con --scale 10 o más)
+    "search": {
+        search_catalog: 70,
+        search_author: 30,
+    },
+    # logins junto a lecturas baratas: con Argon2 en el event loop se frenan también las lecturas
+    "login-mixed": {
+        login: 50,
+        book_detail: 50,
+    },
+}
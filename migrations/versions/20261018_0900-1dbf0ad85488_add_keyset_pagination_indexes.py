@@ -0,0 +1,45 @@
+"""add keyset pagination indexes
+
+Revision ID: 1dbf0ad85488
+Revises: e293bdce5822
+Create Date: 2026-10-18 09:00:12.418305
+
+"""
+from typing import Sequence, Union
+
+import advanced_alchemy
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1dbf0ad85488'
+down_revision: Union[str, Sequence[str], None] = 'e293bdce5822'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = (
+    ('ix_books_created_at_id', 'books', ['created_at', 'id']),
+    ('ix_categories_created_at_id', 'categories', ['created_at', 'id']),
+    ('ix_loans_created_at_id', 'loans', ['created_at', 'id']),
+    ('ix_loans_user_id_loan_dt_id', 'loans', ['user_id', 'loan_dt', 'id']),
+    ('ix_reviews_created_at_id', 'reviews', ['created_at', 'id']),
+    ('ix_users_created_at_id', 'users', ['created_at', 'id']),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY no bloquea escrituras (loans es la tabla más grande y la más escrita),
+    # pero no puede correr dentro de una transacción. if_not_exists permite reintentar
+    # la migración si se cortó a la mitad (un índice que quedó INVALID hay que borrarlo
+    # a mano antes de reintentar).
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,42 @@
+"""add active loans due date index
+
+Revision ID: 84cffc2495e5
+Revises: 93982e63bfae
+Create Date: 2026-10-18 10:00:27.551930
+
+"""
+from typing import Sequence, Union
+
+import advanced_alchemy
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '84cffc2495e5'
+down_revision: Union[str, Sequence[str], None] = '93982e63bfae'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY no bloquea las escrituras en loans mientras se construye, pero no puede
+    # correr dentro de una transacción. if_not_exists permite reintentar la migración (un
+    # índice que quedó INVALID hay que borrarlo a mano antes de reintentar).
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_loans_due_date_active',
+            'loans',
+            ['due_date'],
+            unique=False,
+            postgresql_where=sa.text("status = 'ACTIVE'"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_loans_due_date_active', table_name='loans', postgresql_concurrently=True, if_exists=True)
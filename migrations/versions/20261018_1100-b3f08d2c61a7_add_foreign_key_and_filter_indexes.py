@@ -0,0 +1,45 @@
+"""add foreign key and filter indexes
+
+Revision ID: b3f08d2c61a7
+Revises: 5c1e7a9d2b64
+Create Date: 2026-10-18 11:00:41.093216
+
+"""
+from typing import Sequence, Union
+
+import advanced_alchemy
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3f08d2c61a7'
+down_revision: Union[str, Sequence[str], None] = '5c1e7a9d2b64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# loans.user_id ya está cubierto por ix_loans_user_id_loan_dt_id (1dbf0ad85488)
+INDEXES = (
+    ('ix_loans_book_id', 'loans', ['book_id']),
+    ('ix_loans_status_due_date', 'loans', ['status', 'due_date']),
+    ('ix_loans_loan_dt', 'loans', ['loan_dt']),
+    ('ix_reviews_book_id', 'reviews', ['book_id']),
+    ('ix_reviews_user_id', 'reviews', ['user_id']),
+    ('ix_book_categories_category_id', 'book_categories', ['category_id']),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY no bloquea escrituras, pero no puede correr dentro de una transacción.
+    # if_not_exists permite reintentar la migración si se cortó a la mitad
+    # (un índice que quedó INVALID hay que borrarlo a mano antes de reintentar).
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)